@@ -0,0 +1,54 @@
+import sys
+import json
+import argparse
+from typing import Dict, Iterator, Tuple
+
+# Compara dos resultados de bench/run.py (base y nuevo) métrica por métrica.
+# Una regresión es una caída de filas/s o requests/s, o una suba de latencia
+# o de RSS, mayor al umbral.
+
+HIGHER_IS_BETTER = ("rows_per_s", "requests_per_s")
+LOWER_IS_BETTER = ("p50_ms", "p99_ms", "peak_rss_mb", "server_peak_rss_mb")
+
+def _metrics(node: Dict, prefix: str = "") -> Iterator[Tuple[str, str, float]]:
+    for k, v in node.items():
+        path = f"{prefix}.{k}" if prefix else k
+        if isinstance(v, dict):
+            yield from _metrics(v, path)
+        elif isinstance(v, (int, float)) and k in HIGHER_IS_BETTER + LOWER_IS_BETTER:
+            yield path, k, float(v)
+
+def compare(base: Dict, new: Dict, threshold: float = 0.10):
+    """Retorna [(métrica, base, nuevo, cambio relativo, regresión)]."""
+    old = {path: v for path, _, v in _metrics(base["results"])}
+    rows = []
+    for path, key, v in _metrics(new["results"]):
+        if path not in old or old[path] == 0:
+            continue
+        change = (v - old[path]) / old[path]
+        worse = -change if key in HIGHER_IS_BETTER else change
+        rows.append((path, old[path], v, change, worse > threshold))
+    return rows
+
+def _load(path: str) -> Dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Compara dos resultados de benchmark")
+    p.add_argument("base")
+    p.add_argument("new")
+    p.add_argument("--threshold", type=float, default=0.10, help="cambio relativo tolerado (0.10 = 10%%)")
+    p.add_argument("--fail", action="store_true", help="código de salida 1 si hay regresiones")
+    args = p.parse_args()
+    base, new = _load(args.base), _load(args.new)
+    if base.get("dataset") != new.get("dataset"):
+        print("Aviso: los resultados usan datasets distintos")
+    print(f"base {base.get('commit')}  ->  nuevo {new.get('commit')}")
+    rows = compare(base, new, args.threshold)
+    for path, old, v, change, bad in rows:
+        print(f"{'!!' if bad else '  '} {path:<45} {old:>12.1f} {v:>12.1f} {change:>+8.1%}")
+    regressions = sum(r[4] for r in rows)
+    print(f"{regressions} regresiones sobre {len(rows)} métricas (umbral {args.threshold:.0%})")
+    if args.fail and regressions:
+        sys.exit(1)
@@ -0,0 +1,222 @@
+import os
+import sys
+import json
+import argparse
+from datetime import datetime
+from typing import Dict, List, Tuple
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.compute as pc
+
+# Generador sintético de departments.csv, jobs.csv y hired_employees.csv con
+# el mismo formato que data/: dimensiones sin encabezado, hechos con encabezado.
+# Es determinista: la misma semilla y los mismos parámetros dan los mismos
+# archivos (cada bloque usa su propio generador, sembrado con (semilla, bloque)).
+
+CHUNK_ROWS = 1_000_000  # Filas generadas y escritas por bloque
+
+# Variantes ISO de datetime (nombre -> ejemplo)
+DATETIME_VARIANTS = {
+    "t": "2021-06-27T05:11:12",
+    "space": "2021-06-27 05:11:12",
+    "z": "2021-06-27T05:11:12Z",
+    "ms": "2021-06-27T05:11:12.123",
+    "us_z": "2021-06-27T05:11:12.123456Z",
+    "offset": "2021-06-27T05:11:12+00:00",
+    "date": "2021-06-27",
+}
+DEFAULT_VARIANTS = "t:0.8,space:0.05,z:0.05,ms:0.1"
+
+# Tipos de fila sucia: cada una cae en un solo tipo
+DIRTY_KINDS = {
+    "id": "id vacío o no numérico",
+    "name": "name vacío",
+    "datetime": "datetime vacío o inválido",
+    "fk": "department_id inexistente",
+    "dup": "id repetido de una fila anterior (se descarta al insertar)",
+}
+DEFAULT_DIRTY_MIX = "id:1,name:1,datetime:1,fk:1,dup:1"
+
+COMPRESSIONS = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+
+# "a:0.8,b:0.2" -> (["a", "b"], [0.8, 0.2]) normalizado
+def parse_weights(spec: str, allowed) -> Tuple[List[str], np.ndarray]:
+    names, weights = [], []
+    for part in spec.split(","):
+        name, _, w = part.strip().partition(":")
+        if name not in allowed:
+            raise ValueError(f"'{name}' no es válido; opciones: {', '.join(allowed)}")
+        names.append(name)
+        weights.append(float(w) if w else 1.0)
+    p = np.array(weights, dtype=float)
+    if p.sum() <= 0:
+        raise ValueError(f"pesos inválidos: {spec}")
+    return names, p / p.sum()
+
+def _year_bounds(years: str) -> Tuple[int, int]:
+    first, _, last = years.partition("-")
+    # Segundos UTC, sin depender de la zona horaria local
+    lo = np.datetime64(f"{int(first):04d}-01-01", "s").astype(np.int64)
+    hi = np.datetime64(f"{int(last or first) + 1:04d}-01-01", "s").astype(np.int64)
+    return int(lo), int(hi)
+
+# Texto de cada variante para todo el bloque (`base`: AAAA-MM-DDTHH:MM:SS)
+def _format_datetime(variant: str, base: pa.Array, micros: np.ndarray) -> pa.Array:
+    if variant == "t":
+        return base
+    if variant == "space":
+        return pc.replace_substring(base, "T", " ")
+    if variant == "z":
+        return pc.binary_join_element_wise(base, "Z", "")
+    if variant == "offset":
+        return pc.binary_join_element_wise(base, "+00:00", "")
+    if variant == "date":
+        return pc.utf8_slice_codeunits(base, 0, 10)
+    digits = 3 if variant == "ms" else 6
+    frac = pc.utf8_lpad(pc.cast(pa.array(micros // 10 ** (6 - digits)), pa.string()), digits, "0")
+    out = pc.binary_join_element_wise(base, frac, ".")
+    return pc.binary_join_element_wise(out, "Z", "") if variant == "us_z" else out
+
+def _chunk(seed: int, idx: int, start: int, n: int, opts: Dict, counts: Dict) -> pa.Table:
+    rng = np.random.default_rng([seed, idx])
+    ids = np.arange(start + 1, start + n + 1, dtype=np.int64)
+    dept = rng.integers(1, opts["departments"] + 1, n)
+    job = rng.integers(1, opts["jobs"] + 1, n)
+    lo, hi = opts["bounds"]
+    base = pa.array(np.datetime_as_string(rng.integers(lo, hi, n).astype("datetime64[s]"), unit="s"))
+    micros = rng.integers(0, 1_000_000, n)
+
+    # Datetime: una variante por fila según los pesos
+    variants, vp = opts["variants"]
+    pick = rng.choice(len(variants), n, p=vp).astype(np.int8)
+    dt_str = pc.choose(pa.array(pick), *[_format_datetime(v, base, micros) for v in variants])
+
+    id_str = pc.cast(pa.array(ids), pa.string())
+    comma = pa.array(rng.random(n) < 0.1)  # algunos nombres con coma (campo entre comillas)
+    name = pc.if_else(comma, pc.binary_join_element_wise("Name", id_str, ", "),
+                      pc.binary_join_element_wise("Name", id_str, " "))
+
+    # Filas sucias
+    dirty = rng.random(n) < opts["dirty"]
+    kinds, kp = opts["dirty_mix"]
+    kind = np.full(n, -1, dtype=np.int8)
+    kind[dirty] = rng.choice(len(kinds), int(dirty.sum()), p=kp)
+    for k, name_k in enumerate(kinds):
+        mask = kind == k
+        hits = int(mask.sum())
+        counts[name_k] = counts.get(name_k, 0) + hits
+        if not hits:
+            continue
+        m = pa.array(mask)
+        if name_k == "id":
+            empty = pa.array(rng.random(n) < 0.5)
+            bad = pc.if_else(empty, "", pc.binary_join_element_wise("x", id_str, ""))
+            id_str = pc.if_else(m, bad, id_str)
+        elif name_k == "name":
+            name = pc.if_else(m, "", name)
+        elif name_k == "datetime":
+            bad = np.array(["", "2021-02-30T10:00:00", "not-a-date"])[rng.integers(0, 3, n)]
+            dt_str = pc.if_else(m, pa.array(bad), dt_str)
+        elif name_k == "fk":
+            dept = np.where(mask, opts["departments"] + 1000, dept)
+        elif name_k == "dup":
+            # id de una fila anterior del archivo (la primera aparición gana)
+            prev = np.maximum(1, ids - rng.integers(1, min(start + n, 10_000) + 1, n))
+            id_str = pc.if_else(m, pc.cast(pa.array(prev), pa.string()), id_str)
+
+    return pa.table({
+        "id": id_str,
+        "name": name,
+        "datetime": dt_str,
+        "department_id": pa.array(dept),
+        "job_id": pa.array(job),
+    })
+
+def _open(path: str, compression: str):
+    if compression == "none":
+        return pa.OSFile(path, "wb")
+    return pa.CompressedOutputStream(path, compression)
+
+def _write_dimension(path: str, prefix: str, n: int, compression: str):
+    ids = pa.array(np.arange(1, n + 1))
+    tbl = pa.table({"id": ids, "name": pc.binary_join_element_wise(prefix, pc.cast(ids, pa.string()), " ")})
+    with _open(path, compression) as f:
+        pacsv.write_csv(tbl, f, pacsv.WriteOptions(include_header=False))
+
+def generate(out_dir: str, rows: int, seed: int = 42, dirty: float = 0.02,
+             dirty_mix: str = DEFAULT_DIRTY_MIX, variants: str = DEFAULT_VARIANTS,
+             years: str = "2021", departments: int = 12, jobs: int = 183,
+             compression: str = "none") -> Dict:
+    """
+    Escribe los tres CSV en `out_dir` y un manifest.json con los parámetros y
+    cuántas filas sucias hay de cada tipo. Retorna el manifiesto.
+    """
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"compresión no soportada: {compression}")
+    params = dict(rows=rows, seed=seed, dirty=dirty, dirty_mix=dirty_mix, variants=variants,
+                  years=years, departments=departments, jobs=jobs, compression=compression)
+    opts = dict(departments=departments, jobs=jobs, dirty=dirty, bounds=_year_bounds(years),
+                variants=parse_weights(variants, DATETIME_VARIANTS),
+                dirty_mix=parse_weights(dirty_mix, DIRTY_KINDS))
+    os.makedirs(out_dir, exist_ok=True)
+    ext = ".csv" + COMPRESSIONS[compression]
+    files = {t: os.path.join(out_dir, t + ext) for t in ("departments", "jobs", "hired_employees")}
+
+    _write_dimension(files["departments"], "Dept", departments, compression)
+    _write_dimension(files["jobs"], "Job", jobs, compression)
+    counts: Dict[str, int] = {}
+    with _open(files["hired_employees"], compression) as f:
+        writer = None
+        for idx, start in enumerate(range(0, rows, CHUNK_ROWS)):
+            tbl = _chunk(seed, idx, start, min(CHUNK_ROWS, rows - start), opts, counts)
+            if writer is None:
+                writer = pacsv.CSVWriter(f, tbl.schema)
+            writer.write_table(tbl)
+        if writer is not None:
+            writer.close()
+
+    manifest = {"params": params, "files": files, "dirty_rows": counts,
+                "generated_at": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")}
+    with open(os.path.join(out_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+# Reutiliza los archivos si ya se generaron con los mismos parámetros
+def ensure_dataset(out_dir: str, **params) -> Dict:
+    path = os.path.join(out_dir, "manifest.json")
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        wanted = dict(manifest["params"], **params)
+        if wanted == manifest["params"] and all(os.path.exists(p) for p in manifest["files"].values()):
+            return manifest
+    return generate(out_dir, **params)
+
+def add_dataset_args(p: argparse.ArgumentParser):
+    p.add_argument("--rows", type=int, default=100_000, help="filas de hired_employees (10k a 10M)")
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--dirty", type=float, default=0.02, help="fracción de filas sucias (0 a 1)")
+    p.add_argument("--dirty-mix", default=DEFAULT_DIRTY_MIX,
+                   help=f"pesos por tipo: {', '.join(DIRTY_KINDS)}")
+    p.add_argument("--datetime-variants", dest="variants", default=DEFAULT_VARIANTS,
+                   help=f"pesos por variante: {', '.join(DATETIME_VARIANTS)}")
+    p.add_argument("--years", default="2021", help="año o rango de años (2020-2022)")
+    p.add_argument("--departments", type=int, default=12)
+    p.add_argument("--jobs", type=int, default=183)
+    p.add_argument("--compression", choices=list(COMPRESSIONS), default="none")
+
+def dataset_params(args) -> Dict:
+    return dict(rows=args.rows, seed=args.seed, dirty=args.dirty, dirty_mix=args.dirty_mix,
+                variants=args.variants, years=args.years, departments=args.departments,
+                jobs=args.jobs, compression=args.compression)
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Genera CSV sintéticos para los benchmarks")
+    p.add_argument("--out", default=os.path.join("bench", "data"), help="carpeta de salida")
+    add_dataset_args(p)
+    args = p.parse_args()
+    if not 0 <= args.dirty <= 1:
+        sys.exit("--dirty debe estar entre 0 y 1")
+    m = generate(args.out, **dataset_params(args))
+    print(json.dumps({"files": m["files"], "dirty_rows": m["dirty_rows"]}, indent=2))
@@ -0,0 +1,105 @@
+import os
+import glob
+import shutil
+import socket
+import tempfile
+import subprocess
+from typing import Dict, Optional
+
+# PostgreSQL local y desechable para los benchmarks: initdb en una carpeta
+# temporal, pg_ctl start con socket Unix propio y base "bench". Al cerrar se
+# detiene el servidor y se borra la carpeta.
+#
+# Binarios: PG_BIN, o initdb/pg_ctl del PATH, o `pg_config --bindir`, o
+# /usr/lib/postgresql/*/bin. initdb no corre como root: en ese caso se usa
+# el usuario de BENCH_PG_USER (o el parámetro run_as) vía runuser.
+
+DB_NAME = "bench"
+
+# Configuración por defecto: parecida a una máquina de desarrollo, con fsync
+# activo para que los commits cuesten lo que cuestan en producción
+DEFAULT_SETTINGS = {
+    "shared_buffers": "256MB",
+    "max_connections": "100",
+    "max_wal_size": "4GB",
+    "checkpoint_timeout": "30min",
+}
+
+def find_bin_dir() -> str:
+    candidates = [os.getenv("PG_BIN")]
+    initdb = shutil.which("initdb")
+    if initdb and shutil.which("pg_ctl"):
+        candidates.append(os.path.dirname(initdb))
+    if shutil.which("pg_config"):
+        try:
+            out = subprocess.run(["pg_config", "--bindir"], capture_output=True, text=True, check=True)
+            candidates.append(out.stdout.strip())
+        except (OSError, subprocess.CalledProcessError):
+            pass
+    candidates += sorted(glob.glob("/usr/lib/postgresql/*/bin"), reverse=True)
+    for d in candidates:
+        if d and os.path.exists(os.path.join(d, "initdb")) and os.path.exists(os.path.join(d, "pg_ctl")):
+            return d
+    raise RuntimeError("No se encontraron initdb/pg_ctl: instalar PostgreSQL o definir PG_BIN")
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+class LocalPostgres:
+    def __init__(self, base_dir: Optional[str] = None, port: Optional[int] = None,
+                 settings: Optional[Dict[str, str]] = None, bin_dir: Optional[str] = None,
+                 run_as: Optional[str] = None):
+        self.bin_dir = bin_dir or find_bin_dir()
+        self.port = port or free_port()
+        self.settings = {**DEFAULT_SETTINGS, **(settings or {})}
+        self.run_as = run_as or os.getenv("BENCH_PG_USER")
+        if os.geteuid() == 0 and not self.run_as:
+            raise RuntimeError("initdb no corre como root: definir BENCH_PG_USER con un usuario sin privilegios")
+        self._own_dir = base_dir is None
+        self.base_dir = base_dir or tempfile.mkdtemp(prefix="bench_pg_")
+        self.data_dir = os.path.join(self.base_dir, "data")
+        self.socket_dir = self.base_dir
+        self.started = False
+
+    def _run(self, tool: str, *args: str):
+        cmd = [os.path.join(self.bin_dir, tool), *args]
+        if self.run_as:
+            cmd = ["runuser", "-u", self.run_as, "--", *cmd]
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+    @property
+    def url(self) -> str:
+        return (f"postgresql+psycopg2://postgres@/{DB_NAME}"
+                f"?host={self.socket_dir}&port={self.port}&sslmode=disable")
+
+    def start(self) -> "LocalPostgres":
+        if self.run_as:
+            shutil.chown(self.base_dir, user=self.run_as)
+        self._run("initdb", "-D", self.data_dir, "-U", "postgres", "-A", "trust", "-E", "UTF8",
+                  "--no-sync")
+        opts = [f"-p {self.port}", f"-k {self.socket_dir}", "-c listen_addresses=''"]
+        opts += [f"-c {k}={v}" for k, v in self.settings.items()]
+        self._run("pg_ctl", "-D", self.data_dir, "-w", "-l", os.path.join(self.base_dir, "server.log"),
+                  "-o", " ".join(opts), "start")
+        self.started = True
+        self._run("createdb", "-h", self.socket_dir, "-p", str(self.port), "-U", "postgres", DB_NAME)
+        return self
+
+    def stop(self):
+        if self.started:
+            self._run("pg_ctl", "-D", self.data_dir, "-m", "fast", "-w", "stop")
+            self.started = False
+        if self._own_dir:
+            shutil.rmtree(self.base_dir, ignore_errors=True)
+
+    def __enter__(self) -> "LocalPostgres":
+        try:
+            return self.start()
+        except Exception:
+            self.stop()
+            raise
+
+    def __exit__(self, *exc):
+        self.stop()
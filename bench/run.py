@@ -0,0 +1,160 @@
+import os
+import sys
+import json
+import platform
+import argparse
+import subprocess
+from datetime import datetime
+from typing import Dict, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+from bench.generate import add_dataset_args, dataset_params, ensure_dataset
+from bench.pg_harness import LocalPostgres
+from bench.scenarios import SCENARIOS, run_isolated
+
+# Corre los escenarios contra un PostgreSQL local desechable y guarda las
+# métricas en bench/results/<fecha>-<commit>.json para compararlas entre
+# commits con bench/compare.py.
+
+DATA_DIR = os.path.join(REPO_ROOT, "bench", "data")
+RESULTS_DIR = os.path.join(REPO_ROOT, "bench", "results")
+
+def _git(*args: str) -> str:
+    try:
+        out = subprocess.run(["git", *args], cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _years(spec: str) -> List[int]:
+    first, _, last = spec.partition("-")
+    return list(range(int(first), int(last or first) + 1))
+
+def _server_version(url: str) -> str:
+    from sqlalchemy import create_engine, text
+    engine = create_engine(url)
+    try:
+        with engine.connect() as conn:
+            return conn.execute(text("SHOW server_version")).scalar()
+    finally:
+        engine.dispose()
+
+# Esquema con el runner de migraciones y una partición por año del dataset
+def prepare_schema(url: str, years: List[int]):
+    env = {**os.environ, "DATABASE_URL": url}
+    script = os.path.join(REPO_ROOT, "src", "apply_schema.py")
+    subprocess.run([sys.executable, script], env=env, check=True, stdout=subprocess.DEVNULL)
+    for y in years:
+        subprocess.run([sys.executable, script, "--ensure-year", str(y)], env=env, check=True,
+                       stdout=subprocess.DEVNULL)
+
+def _settings(items: List[str]) -> Dict[str, str]:
+    out = {}
+    for item in items:
+        k, sep, v = item.partition("=")
+        if not sep:
+            raise SystemExit(f"--pg-setting espera clave=valor: {item}")
+        out[k] = v
+    return out
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Benchmarks de carga, ingesta, backups y métricas")
+    p.add_argument("--scenarios", default=",".join(SCENARIOS),
+                   help=f"lista separada por comas: {', '.join(SCENARIOS)}")
+    p.add_argument("--data-dir", default=DATA_DIR, help="carpeta de los CSV generados (se reutilizan)")
+    p.add_argument("--out", help="archivo JSON de resultados (por defecto bench/results/<fecha>-<commit>.json)")
+    p.add_argument("--database-url",
+                   help="usar esta base en vez de levantar un PostgreSQL local (¡se vacían sus tablas!)")
+    p.add_argument("--pg-setting", action="append", default=[], metavar="CLAVE=VALOR",
+                   help="parámetro del PostgreSQL local (repetible), p. ej. fsync=off")
+    p.add_argument("--load-mode", choices=("copy", "batch"), default="copy")
+    p.add_argument("--workers", type=int, default=1, help="procesos de validación / workers de restore")
+    p.add_argument("--writers", type=int, default=1, help="conexiones escritoras de la carga")
+    p.add_argument("--clients", type=int, default=8, help="clientes HTTP concurrentes")
+    p.add_argument("--ingest-rows", type=int, default=20_000, help="filas enviadas por /ingest y /ingest/stream")
+    p.add_argument("--ingest-batch", type=int, default=1000, help="filas por request de /ingest (máx. 1000)")
+    p.add_argument("--repeat", type=int, default=3, help="repeticiones de cada backup/restore")
+    p.add_argument("--metric-requests", type=int, default=200, help="requests por endpoint de métricas")
+    p.add_argument("--metrics-cache", action="store_true", help="no desactivar la caché de /metrics")
+    add_dataset_args(p)
+    args = p.parse_args(argv)
+    args.scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = [s for s in args.scenarios if s not in SCENARIOS]
+    if unknown:
+        p.error(f"escenarios desconocidos: {', '.join(unknown)}")
+    if not 1 <= args.ingest_batch <= 1000:
+        p.error("--ingest-batch debe estar entre 1 y 1000")
+    return args
+
+def _summary(results: Dict):
+    # Una línea por métrica principal
+    def walk(prefix, node):
+        for k, v in node.items():
+            path = f"{prefix}.{k}" if prefix else k
+            if isinstance(v, dict):
+                walk(path, v)
+            elif k in ("rows_per_s", "requests_per_s", "p50_ms", "p99_ms", "peak_rss_mb", "server_peak_rss_mb"):
+                print(f"  {path:<45} {v}")
+    walk("", results)
+
+def main(argv=None):
+    args = parse_args(argv)
+    print(f"Dataset: {args.rows} filas en {args.data_dir}")
+    manifest = ensure_dataset(args.data_dir, **dataset_params(args))
+    years = _years(args.years)
+
+    pg = None
+    url = args.database_url
+    if url is None:
+        pg = LocalPostgres(settings=_settings(args.pg_setting)).start()
+        url = pg.url
+    try:
+        os.environ["DATABASE_URL"] = url  # lo heredan los escenarios (spawn) y la API
+        prepare_schema(url, years)
+        work_dir = os.path.join(args.data_dir, "work")
+        os.makedirs(work_dir, exist_ok=True)
+        ctx = {
+            "files": manifest["files"], "rows": args.rows, "years": years, "work_dir": work_dir,
+            "dimension_rows": {"departments": args.departments, "jobs": args.jobs},
+            "load_mode": args.load_mode, "workers": args.workers, "writers": args.writers,
+            "clients": args.clients, "ingest_rows": args.ingest_rows, "ingest_batch": args.ingest_batch,
+            "repeat": args.repeat, "metric_requests": args.metric_requests,
+            "metrics_cache": args.metrics_cache,
+        }
+        results = {}
+        # Los demás escenarios necesitan las tablas cargadas
+        if "load" not in args.scenarios:
+            print("Preparación: carga histórica (sin medir)")
+            run_isolated("load", ctx)
+        for name in args.scenarios:
+            print(f"Escenario {name}...")
+            results[name] = run_isolated(name, ctx)
+        version = _server_version(url)
+    finally:
+        if pg is not None:
+            pg.stop()
+
+    commit = _git("rev-parse", "--short", "HEAD")
+    report = {
+        "commit": commit,
+        "dirty_tree": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "started_at": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "host": {"python": platform.python_version(), "platform": platform.platform(),
+                 "cpus": os.cpu_count(), "postgres": version, "local_postgres": pg is not None},
+        "dataset": {**manifest["params"], "dirty_rows": manifest["dirty_rows"]},
+        "settings": {k: v for k, v in ctx.items() if k not in ("files", "work_dir")},
+        "results": results,
+    }
+    out = args.out
+    if out is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        out = os.path.join(RESULTS_DIR, f"{datetime.utcnow():%Y%m%dT%H%M%SZ}-{commit or 'nogit'}.json")
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Resultados en {out}")
+    _summary(results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+import os
+import sys
+import json
+import time
+import queue
+import shutil
+import resource
+import tempfile
+import threading
+import contextlib
+import subprocess
+import http.client
+import multiprocessing as mp
+from typing import Callable, Dict, Iterator, List
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pacsv
+from dotenv import load_dotenv
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+load_dotenv(os.path.join(REPO_ROOT, ".env"))  # API_KEY del .env, igual que el servidor (src/db.py)
+
+# Escenarios de benchmark. Cada uno recibe un contexto (dict con la URL de la
+# base, los archivos generados y los parámetros de la corrida) y retorna un
+# dict de métricas: filas/s, latencias p50/p99 en ms y pico de RSS en MB.
+# run_isolated los ejecuta en un proceso nuevo (spawn), así el pico de RSS y
+# los pools de conexiones son solo del escenario.
+
+TABLES = ("departments", "jobs", "hired_employees")
+HEADER = {"departments": False, "jobs": False, "hired_employees": True}
+INGEST_ID_BASE = 100_000_000  # ids de /ingest fuera del rango del archivo generado
+
+# Estadísticas
+def latency_stats(samples: List[float]) -> Dict:
+    """Segundos -> p50/p99/máx en milisegundos."""
+    if not samples:
+        return {"n": 0, "p50_ms": None, "p99_ms": None, "max_ms": None}
+    a = np.array(samples) * 1000
+    return {"n": len(samples), "p50_ms": round(float(np.percentile(a, 50)), 3),
+            "p99_ms": round(float(np.percentile(a, 99)), 3), "max_ms": round(float(a.max()), 3)}
+
+def rate(rows: int, seconds: float) -> float:
+    return round(rows / seconds, 1) if seconds > 0 else None
+
+def _peak_rss_mb() -> Dict:
+    # ru_maxrss en KB (Linux); children: el mayor de los procesos hijos terminados
+    return {
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "peak_rss_children_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+    }
+
+def _proc_peak_rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return round(int(line.split()[1]) / 1024, 1)
+    return None
+
+@contextlib.contextmanager
+def _quiet():
+    # Los scripts imprimen progreso por chunk: se descarta durante la medición
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+def _truncate(engine, tables):
+    from sqlalchemy import text
+    from src.aggregates import AGG_TABLE
+    from src.pg_bulk import ID_REGISTRY
+    # Con los hechos se vacía su registro de ids (si no, todo cuenta como duplicado)
+    tables = list(tables) + [ID_REGISTRY[t] for t in tables if t in ID_REGISTRY]
+    with engine.begin() as conn:
+        conn.execute(text(f"TRUNCATE {', '.join(tables)}, {AGG_TABLE}"))
+
+def _count(engine, table: str) -> int:
+    from sqlalchemy import text
+    with engine.connect() as conn:
+        return conn.execute(text(f"SELECT count(*) FROM {table}")).scalar()
+
+# Carga histórica (load_historico.py) desde tablas vacías
+def scenario_load(ctx: Dict) -> Dict:
+    import src.load_historico as lh
+    from src.db import get_engine
+    engine = get_engine()
+    _truncate(engine, ["hired_employees", "departments", "jobs"])
+
+    # Latencia de escritura por chunk (COPY + merge o lotes de 1000)
+    writes: List[float] = []
+    lock = threading.Lock()
+    write_chunk = lh.write_chunk
+
+    def timed_write(*args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return write_chunk(*args, **kwargs)
+        finally:
+            with lock:
+                writes.append(time.perf_counter() - t0)
+    lh.write_chunk = timed_write
+
+    tables = {}
+    total_rows, total_secs = 0, 0.0
+    for table in TABLES:
+        t0 = time.perf_counter()
+        with _quiet():
+            lh.load_table(table, ctx["files"][table], header=HEADER[table], mode=ctx["load_mode"],
+                          workers=ctx["workers"], writers=ctx["writers"], checkpoint=False)
+        secs = time.perf_counter() - t0
+        read = ctx["rows"] if table == "hired_employees" else ctx["dimension_rows"][table]
+        tables[table] = {"rows": read, "inserted": _count(engine, table),
+                         "seconds": round(secs, 3), "rows_per_s": rate(read, secs)}
+        total_rows += read
+        total_secs += secs
+    lh.reject_sink.flush()
+    return {"mode": ctx["load_mode"], "workers": ctx["workers"], "writers": ctx["writers"],
+            "rows": total_rows, "seconds": round(total_secs, 3), "rows_per_s": rate(total_rows, total_secs),
+            "chunk_write": latency_stats(writes), "tables": tables}
+
+# Servidor de la API (uvicorn) en un subproceso
+@contextlib.contextmanager
+def api_server(ctx: Dict, env: Dict = None) -> Iterator[Dict]:
+    from bench.pg_harness import free_port
+    port = free_port()
+    proc_env = {**os.environ, "PYTHONPATH": REPO_ROOT, **(env or {})}
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ctx["work_dir"], env=proc_env,
+    )
+    try:
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                status, _ = _request(("127.0.0.1", port), "GET", "/health")
+                if status == 200:
+                    break
+            except OSError:
+                pass
+            if proc.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError("la API no arrancó")
+            time.sleep(0.2)
+        yield {"addr": ("127.0.0.1", port), "pid": proc.pid}
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+def _headers(extra: Dict = None) -> Dict:
+    h = dict(extra or {})
+    if os.getenv("API_KEY"):
+        h["x-api-key"] = os.environ["API_KEY"]
+    return h
+
+def _request(addr, method: str, path: str, body=None, headers: Dict = None, conn=None):
+    own = conn is None
+    conn = conn or http.client.HTTPConnection(*addr, timeout=300)
+    try:
+        conn.request(method, path, body=body, headers=_headers(headers))
+        resp = conn.getresponse()
+        data = resp.read()
+        # 4xx (clave, ruta o payload inválidos) no cuenta como request exitoso
+        if resp.status >= 400:
+            raise RuntimeError(f"{method} {path}: {resp.status} {data[:200]!r}")
+        return resp.status, data
+    finally:
+        if own:
+            conn.close()
+
+# N clientes en paralelo, cada uno con su conexión keep-alive
+def _run_clients(addr, clients: int, jobs: List[Callable]) -> Dict:
+    q: "queue.Queue" = queue.Queue()
+    for job in jobs:
+        q.put(job)
+    latencies: List[float] = []
+    errors: List[str] = []
+    lock = threading.Lock()
+
+    def worker():
+        conn = http.client.HTTPConnection(*addr, timeout=300)
+        try:
+            while True:
+                try:
+                    job = q.get_nowait()
+                except queue.Empty:
+                    return
+                t0 = time.perf_counter()
+                try:
+                    job(conn)
+                except Exception as e:
+                    with lock:
+                        errors.append(str(e))
+                    conn.close()
+                    conn = http.client.HTTPConnection(*addr, timeout=300)
+                    continue
+                with lock:
+                    latencies.append(time.perf_counter() - t0)
+        finally:
+            conn.close()
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return {"seconds": time.perf_counter() - t0, "latencies": latencies, "errors": errors}
+
+# Filas del archivo generado como dicts de texto, con ids corridos a `base`
+def _payload_rows(ctx: Dict, n: int, base: int) -> List[Dict]:
+    opts = pacsv.ReadOptions(block_size=8 << 20)
+    conv = pacsv.ConvertOptions(column_types={c: pa.string() for c in ("id", "name", "datetime")},
+                                strings_can_be_null=False)
+    rows: List[Dict] = []
+    with pacsv.open_csv(ctx["files"]["hired_employees"], read_options=opts, convert_options=conv) as r:
+        for batch in r:
+            for row in batch.to_pylist():
+                if row["id"].isdigit():
+                    row["id"] = base + int(row["id"])
+                rows.append(row)
+                if len(rows) >= n:
+                    return rows
+    return rows
+
+# POST /ingest (lotes JSON) y POST /ingest/stream (NDJSON) con clientes concurrentes
+def scenario_ingest(ctx: Dict) -> Dict:
+    n = min(ctx["ingest_rows"], ctx["rows"])
+    batch = ctx["ingest_batch"]
+    clients = ctx["clients"]
+    out = {"clients": clients, "rows": n}
+    with api_server(ctx) as api:
+        rows = _payload_rows(ctx, n, INGEST_ID_BASE)
+
+        def post_batch(chunk):
+            body = json.dumps({"table": "hired_employees", "rows": chunk}).encode("utf-8")
+            return lambda conn: _request(api["addr"], "POST", "/ingest", body,
+                                         {"Content-Type": "application/json"}, conn)
+        res = _run_clients(api["addr"], clients,
+                           [post_batch(rows[i:i + batch]) for i in range(0, n, batch)])
+        out["ingest"] = {"batch_rows": batch, "requests": len(res["latencies"]), "errors": len(res["errors"]),
+                         "seconds": round(res["seconds"], 3), "rows_per_s": rate(n, res["seconds"]),
+                         "latency": latency_stats(res["latencies"])}
+
+        # Stream: mismas filas con otros ids, un request por cliente
+        rows = _payload_rows(ctx, n, 2 * INGEST_ID_BASE)
+        per_client = -(-n // clients)
+
+        def post_stream(chunk):
+            body = "".join(json.dumps(r) + "\n" for r in chunk).encode("utf-8")
+            return lambda conn: _request(api["addr"], "POST", "/ingest/stream/hired_employees", body,
+                                         {"Content-Type": "application/x-ndjson"}, conn)
+        res = _run_clients(api["addr"], clients,
+                           [post_stream(rows[i:i + per_client]) for i in range(0, n, per_client)])
+        out["ingest_stream"] = {"requests": len(res["latencies"]), "errors": len(res["errors"]),
+                                "seconds": round(res["seconds"], 3), "rows_per_s": rate(n, res["seconds"]),
+                                "latency": latency_stats(res["latencies"])}
+        out["server_peak_rss_mb"] = _proc_peak_rss_mb(api["pid"])
+    return out
+
+# Backup y restauración de hired_employees en Parquet y Avro
+def scenario_backup(ctx: Dict) -> Dict:
+    from src.db import get_engine
+    from src.parquet_utils import backup_parquet
+    from src.avro_utils import backup_avro
+    from src.restore_engine import restore_files
+    engine = get_engine()
+    rows = _count(engine, "hired_employees")
+    out_dir = tempfile.mkdtemp(prefix="bench_backup_", dir=ctx["work_dir"])
+    writers = {
+        "parquet": lambda: backup_parquet(engine, "hired_employees", out_dir=out_dir),
+        "avro": lambda: backup_avro("hired_employees", out_dir=out_dir),
+    }
+    out = {"rows": rows, "repeat": ctx["repeat"]}
+    try:
+        for fmt, backup in writers.items():
+            secs, path = [], None
+            for _ in range(ctx["repeat"]):
+                if path:
+                    os.remove(path)
+                t0 = time.perf_counter()
+                path, _ = backup()
+                secs.append(time.perf_counter() - t0)
+            out[f"backup_{fmt}"] = {"bytes": os.path.getsize(path), "rows_per_s": rate(rows, float(np.median(secs))),
+                                    "latency": latency_stats(secs)}
+            secs = []
+            for _ in range(ctx["repeat"]):
+                _truncate(engine, ["hired_employees"])
+                t0 = time.perf_counter()
+                restore_files(engine, "hired_employees", [path], workers=ctx["workers"])
+                secs.append(time.perf_counter() - t0)
+            out[f"restore_{fmt}"] = {"workers": ctx["workers"], "rows_per_s": rate(rows, float(np.median(secs))),
+                                     "latency": latency_stats(secs)}
+            os.remove(path)
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+    return out
+
+# GET /metrics/* sin caché de respuestas (cada request va a la base)
+def scenario_metrics(ctx: Dict) -> Dict:
+    years = ctx["years"]
+    n = ctx["metric_requests"]
+    env = {} if ctx["metrics_cache"] else {"METRICS_CACHE_TTL": "0"}
+    out = {"clients": ctx["clients"], "cache": ctx["metrics_cache"], "years": years}
+    with api_server(ctx, env) as api:
+        for endpoint in ("hired_by_quarter", "top_departments"):
+            def get(year, path=f"/metrics/{endpoint}"):
+                return lambda conn: _request(api["addr"], "GET", f"{path}?year={year}", conn=conn)
+            _run_clients(api["addr"], ctx["clients"], [get(y) for y in years])  # calentamiento
+            res = _run_clients(api["addr"], ctx["clients"], [get(years[i % len(years)]) for i in range(n)])
+            out[endpoint] = {"requests": len(res["latencies"]), "errors": len(res["errors"]),
+                             "requests_per_s": rate(len(res["latencies"]), res["seconds"]),
+                             "latency": latency_stats(res["latencies"])}
+        out["server_peak_rss_mb"] = _proc_peak_rss_mb(api["pid"])
+    return out
+
+SCENARIOS = {
+    "load": scenario_load,
+    "ingest": scenario_ingest,
+    "backup": scenario_backup,
+    "metrics": scenario_metrics,
+}
+
+def _child(name: str, ctx: Dict, conn):
+    try:
+        os.chdir(ctx["work_dir"])
+        result = SCENARIOS[name](ctx)
+        result.update(_peak_rss_mb())
+        conn.send(("ok", result))
+    except BaseException as e:
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+def run_isolated(name: str, ctx: Dict) -> Dict:
+    """Ejecuta el escenario en un proceso nuevo y retorna sus métricas."""
+    spawn = mp.get_context("spawn")
+    parent, child = spawn.Pipe(duplex=False)
+    proc = spawn.Process(target=_child, args=(name, ctx, child), name=f"bench-{name}")
+    proc.start()
+    child.close()
+    try:
+        status, payload = parent.recv()
+    except EOFError:  # el proceso murió sin responder (p. ej. sin memoria)
+        proc.join()
+        status, payload = "error", f"el proceso terminó con código {proc.exitcode}"
+    proc.join()
+    if status != "ok":
+        raise RuntimeError(f"escenario {name}: {payload}")
+    return payload
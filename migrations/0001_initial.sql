@@ -0,0 +1,32 @@
+-- Esquema inicial (antes schema.sql). Idempotente: no borra tablas existentes.
+
+-- Tablas de dimensiones
+CREATE TABLE IF NOT EXISTS departments (
+  id   INTEGER PRIMARY KEY,
+  name TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS jobs (
+  id   INTEGER PRIMARY KEY,
+  name TEXT NOT NULL
+);
+
+-- Tabla de hecho (0002 la convierte en particionada por año)
+CREATE TABLE IF NOT EXISTS hired_employees (
+  id             INTEGER PRIMARY KEY,
+  name           TEXT NOT NULL,
+  datetime       TIMESTAMP NOT NULL,
+  department_id  INTEGER NOT NULL REFERENCES departments(id),
+  job_id         INTEGER NOT NULL REFERENCES jobs(id)
+);
+
+-- Agregado para /metrics: se actualiza en la misma transacción que cada
+-- INSERT a hired_employees (ver src/pg_bulk.py)
+CREATE TABLE IF NOT EXISTS hires_by_year_quarter_dept_job (
+  year           SMALLINT NOT NULL,
+  quarter        SMALLINT NOT NULL,
+  department_id  INTEGER  NOT NULL,
+  job_id         INTEGER  NOT NULL,
+  hires          INTEGER  NOT NULL,
+  PRIMARY KEY (year, quarter, department_id, job_id)
+);
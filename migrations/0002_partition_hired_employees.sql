@@ -0,0 +1,63 @@
+-- hired_employees particionada por rango de datetime, una partición por año
+-- (hired_employees_y2021, ...) más una DEFAULT para años sin partición.
+-- La PK pasa a (id, datetime): toda clave única debe incluir la clave de
+-- partición. La unicidad de id la mantiene el merge (ver src/pg_bulk.py).
+
+-- Crea la partición de un año; si la DEFAULT ya tiene filas de ese año,
+-- las mueve a la partición nueva antes de adjuntarla
+CREATE OR REPLACE FUNCTION ensure_hired_partition(y INTEGER) RETURNS VOID
+LANGUAGE plpgsql AS $$
+DECLARE
+  part TEXT := format('hired_employees_y%s', y);
+  lo   TIMESTAMP := make_timestamp(y, 1, 1, 0, 0, 0);
+  hi   TIMESTAMP := make_timestamp(y + 1, 1, 1, 0, 0, 0);
+BEGIN
+  IF to_regclass(part) IS NOT NULL THEN
+    RETURN;
+  END IF;
+  IF to_regclass('hired_employees_default') IS NOT NULL AND EXISTS (
+       SELECT 1 FROM hired_employees_default WHERE datetime >= lo AND datetime < hi) THEN
+    EXECUTE format('CREATE TABLE %I (LIKE hired_employees INCLUDING DEFAULTS)', part);
+    EXECUTE format(
+      'WITH moved AS (DELETE FROM hired_employees_default WHERE datetime >= $1 AND datetime < $2 RETURNING *) '
+      'INSERT INTO %I SELECT * FROM moved', part) USING lo, hi;
+    EXECUTE format('ALTER TABLE hired_employees ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)', part, lo, hi);
+  ELSE
+    EXECUTE format('CREATE TABLE %I PARTITION OF hired_employees FOR VALUES FROM (%L) TO (%L)', part, lo, hi);
+  END IF;
+END $$;
+
+DO $$
+DECLARE
+  y INTEGER;
+BEGIN
+  IF (SELECT relkind FROM pg_class WHERE oid = 'hired_employees'::regclass) = 'p' THEN
+    RETURN;  -- ya particionada
+  END IF;
+
+  ALTER TABLE hired_employees RENAME TO hired_employees_old;
+  ALTER TABLE hired_employees_old RENAME CONSTRAINT hired_employees_pkey TO hired_employees_old_pkey;
+
+  CREATE TABLE hired_employees (
+    id             INTEGER NOT NULL,
+    name           TEXT NOT NULL,
+    datetime       TIMESTAMP NOT NULL,
+    department_id  INTEGER NOT NULL REFERENCES departments(id),
+    job_id         INTEGER NOT NULL REFERENCES jobs(id),
+    PRIMARY KEY (id, datetime)
+  ) PARTITION BY RANGE (datetime);
+  CREATE TABLE hired_employees_default PARTITION OF hired_employees DEFAULT;
+
+  -- Años con datos, más el actual y el siguiente
+  FOR y IN
+    SELECT DISTINCT EXTRACT(YEAR FROM datetime)::int FROM hired_employees_old
+    UNION SELECT EXTRACT(YEAR FROM now())::int
+    UNION SELECT EXTRACT(YEAR FROM now())::int + 1
+  LOOP
+    PERFORM ensure_hired_partition(y);
+  END LOOP;
+
+  INSERT INTO hired_employees (id, name, datetime, department_id, job_id)
+  SELECT id, name, datetime, department_id, job_id FROM hired_employees_old;
+  DROP TABLE hired_employees_old;
+END $$;
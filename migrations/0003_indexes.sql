@@ -0,0 +1,15 @@
+-- Índices para los accesos por FK y por rango de fechas. Sobre la tabla
+-- particionada se crean en cada partición (también en las futuras).
+
+-- FKs: joins con las dimensiones y chequeo al borrar un departamento/job
+CREATE INDEX IF NOT EXISTS hired_employees_department_id_idx ON hired_employees (department_id);
+CREATE INDEX IF NOT EXISTS hired_employees_job_id_idx ON hired_employees (job_id);
+
+-- Rango de fechas con las columnas del agregado incluidas (index-only scan
+-- al recalcular hires_by_year_quarter_dept_job o filtrar por período)
+CREATE INDEX IF NOT EXISTS hired_employees_datetime_idx
+  ON hired_employees (datetime) INCLUDE (department_id, job_id);
+
+-- /metrics/top_departments: suma por departamento dentro de un año
+CREATE INDEX IF NOT EXISTS hires_agg_year_department_idx
+  ON hires_by_year_quarter_dept_job (year, department_id) INCLUDE (hires);
@@ -0,0 +1,12 @@
+-- Unicidad de hired_employees.id: la PK de la tabla particionada es
+-- (id, datetime), así que los ids se registran en una tabla sin particionar.
+-- El merge (src/pg_bulk.py) inserta primero aquí con ON CONFLICT DO NOTHING
+-- y solo pasan a hired_employees las filas cuyo id quedó registrado, en la
+-- misma sentencia. La base garantiza la unicidad sin locks globales.
+CREATE TABLE IF NOT EXISTS hired_employee_ids (
+  id  INTEGER PRIMARY KEY
+);
+
+INSERT INTO hired_employee_ids (id)
+SELECT id FROM hired_employees
+ON CONFLICT DO NOTHING;
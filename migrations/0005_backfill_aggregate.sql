@@ -0,0 +1,12 @@
+-- Agregado de /metrics desde la tabla de hechos. En una base que ya tenía
+-- datos, 0001 crea hires_by_year_quarter_dept_job vacía y 0002 solo copia
+-- las filas de hired_employees: sin este paso /metrics quedaría vacío.
+-- Se recalcula completo (mismo SELECT que src/aggregates.py agg_select), así
+-- también corrige una base donde el agregado ya se venía manteniendo.
+TRUNCATE hires_by_year_quarter_dept_job;
+
+INSERT INTO hires_by_year_quarter_dept_job (year, quarter, department_id, job_id, hires)
+SELECT EXTRACT(YEAR FROM datetime)::int, EXTRACT(QUARTER FROM datetime)::int,
+       department_id, job_id, count(*)
+FROM hired_employees
+GROUP BY 1, 2, 3, 4;
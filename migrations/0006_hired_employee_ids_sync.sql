@@ -0,0 +1,33 @@
+-- hired_employee_ids sigue a hired_employees: al borrar filas (DELETE) o
+-- vaciar la tabla (TRUNCATE) se liberan sus ids. Sin esto, un /restore o una
+-- recarga después de borrar contaría esas filas como duplicadas.
+CREATE OR REPLACE FUNCTION hired_employee_ids_release() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+  DELETE FROM hired_employee_ids i USING old_rows o WHERE i.id = o.id;
+  RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION hired_employee_ids_clear() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+  TRUNCATE hired_employee_ids;
+  RETURN NULL;
+END
+$$;
+
+DROP TRIGGER IF EXISTS hired_employees_release_ids ON hired_employees;
+CREATE TRIGGER hired_employees_release_ids
+  AFTER DELETE ON hired_employees
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION hired_employee_ids_release();
+
+DROP TRIGGER IF EXISTS hired_employees_clear_ids ON hired_employees;
+CREATE TRIGGER hired_employees_clear_ids
+  AFTER TRUNCATE ON hired_employees
+  FOR EACH STATEMENT EXECUTE FUNCTION hired_employee_ids_clear();
+
+-- Ids que quedaron registrados por borrados anteriores a este trigger
+DELETE FROM hired_employee_ids i
+WHERE NOT EXISTS (SELECT 1 FROM hired_employees h WHERE h.id = i.id);
@@ -0,0 +1,30 @@
+-- ensure_hired_partition segura con llamadas concurrentes: la carga
+-- histórica, /ingest y las restauraciones crean la partición del año antes
+-- de escribir (src/pg_bulk.py ensure_partitions), y dos procesos pueden pedir
+-- el mismo año a la vez. Un advisory lock de transacción serializa la
+-- creación y el segundo encuentra la partición ya creada.
+CREATE OR REPLACE FUNCTION ensure_hired_partition(y INTEGER) RETURNS VOID
+LANGUAGE plpgsql AS $$
+DECLARE
+  part TEXT := format('hired_employees_y%s', y);
+  lo   TIMESTAMP := make_timestamp(y, 1, 1, 0, 0, 0);
+  hi   TIMESTAMP := make_timestamp(y + 1, 1, 1, 0, 0, 0);
+BEGIN
+  IF to_regclass(part) IS NOT NULL THEN
+    RETURN;
+  END IF;
+  PERFORM pg_advisory_xact_lock(7413002);
+  IF to_regclass(part) IS NOT NULL THEN
+    RETURN;
+  END IF;
+  IF to_regclass('hired_employees_default') IS NOT NULL AND EXISTS (
+       SELECT 1 FROM hired_employees_default WHERE datetime >= lo AND datetime < hi) THEN
+    EXECUTE format('CREATE TABLE %I (LIKE hired_employees INCLUDING DEFAULTS)', part);
+    EXECUTE format(
+      'WITH moved AS (DELETE FROM hired_employees_default WHERE datetime >= $1 AND datetime < $2 RETURNING *) '
+      'INSERT INTO %I SELECT * FROM moved', part) USING lo, hi;
+    EXECUTE format('ALTER TABLE hired_employees ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)', part, lo, hi);
+  ELSE
+    EXECUTE format('CREATE TABLE %I PARTITION OF hired_employees FOR VALUES FROM (%L) TO (%L)', part, lo, hi);
+  END IF;
+END $$;
@@ -0,0 +1,43 @@
+import os
+import sys
+from sqlalchemy import text
+
+# Agregado de contrataciones por año, trimestre, departamento y job.
+# Se mantiene en la misma transacción que cada INSERT a hired_employees
+# (solo cuentan las filas realmente insertadas, vía RETURNING), así las
+# métricas no recorren la tabla de hechos.
+
+AGG_TABLE = "hires_by_year_quarter_dept_job"
+
+# Tablas cuyo INSERT actualiza el agregado (ver pg_bulk.merge_sql)
+AGGREGATED = ("hired_employees",)
+
+# Filas del agregado a partir de un conjunto con datetime, department_id y job_id.
+# Ordenadas por clave: los escritores concurrentes bloquean las filas del
+# agregado en el mismo orden (se esperan entre sí, pero no hay deadlock).
+def agg_select(source: str) -> str:
+    return f"""
+      SELECT EXTRACT(YEAR FROM datetime)::int, EXTRACT(QUARTER FROM datetime)::int,
+             department_id, job_id, count(*)
+      FROM {source}
+      GROUP BY 1, 2, 3, 4
+      ORDER BY 1, 2, 3, 4
+    """
+
+# Recalcula el agregado desde cero (tabla nueva o tras borrar filas a mano)
+def rebuild_aggregates(conn):
+    conn.execute(text(f"TRUNCATE {AGG_TABLE}"))
+    conn.execute(text(
+        f"INSERT INTO {AGG_TABLE} (year, quarter, department_id, job_id, hires) "
+        + agg_select("hired_employees")
+    ))
+
+if __name__ == "__main__":
+    # Permite ejecutar como script (python src/aggregates.py)
+    if __package__ in (None, ""):
+        sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from src.db import get_engine
+    with get_engine().begin() as conn:
+        rebuild_aggregates(conn)
+        n = conn.execute(text(f"SELECT count(*), coalesce(sum(hires), 0) FROM {AGG_TABLE}")).one()
+    print(f"{AGG_TABLE} reconstruida: {n[0]} grupos, {n[1]} contrataciones")
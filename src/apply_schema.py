@@ -0,0 +1,145 @@
+import os
+import sys
+import hashlib
+import argparse
+from typing import List, Tuple
+from sqlalchemy import text
+
+# Permite ejecutar como script (python src/apply_schema.py) o como módulo
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.db import get_engine
+from src.aggregates import AGG_TABLE
+
+# Migraciones versionadas: migrations/NNNN_nombre.sql, en orden de versión.
+# Cada una se aplica una sola vez, en su propia transacción, y queda
+# registrada en schema_migrations. Un advisory lock evita que dos procesos
+# (p. ej. varias réplicas de la API al arrancar) migren a la vez.
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
+LOCK_KEY = 7_413_001 # pg_advisory_lock del runner
+
+def list_migrations(folder: str = MIGRATIONS_DIR) -> List[Tuple[str, str, str]]:
+    """(versión, nombre, ruta) de cada .sql, ordenadas por versión."""
+    out = []
+    for fname in sorted(os.listdir(folder)):
+        if not fname.endswith(".sql"):
+            continue
+        version, _, name = fname[:-4].partition("_")
+        if not version.isdigit():
+            raise ValueError(f"Migración sin versión numérica: {fname}")
+        out.append((version, name, os.path.join(folder, fname)))
+    return out
+
+def _checksum(sql: str) -> str:
+    return hashlib.sha256(sql.encode("utf-8")).hexdigest()
+
+def _ensure_table(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+          version     TEXT PRIMARY KEY,
+          name        TEXT NOT NULL,
+          checksum    TEXT NOT NULL,
+          applied_at  TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """)
+
+def _applied(cur) -> dict:
+    cur.execute("SELECT version, checksum FROM schema_migrations")
+    return dict(cur.fetchall())
+
+def migrate(engine=None, folder: str = MIGRATIONS_DIR) -> List[str]:
+    """
+    Aplica las migraciones pendientes y retorna sus versiones.
+    Falla si una migración ya aplicada cambió de contenido.
+    """
+    engine = engine or get_engine()
+    done = []
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        cur.execute("SELECT pg_advisory_lock(%s)", (LOCK_KEY,))
+        try:
+            _ensure_table(cur)
+            applied = _applied(cur)
+            raw.commit()
+            for version, name, path in list_migrations(folder):
+                with open(path, encoding="utf-8") as f:
+                    sql = f.read()
+                if version in applied:
+                    if applied[version] != _checksum(sql):
+                        raise RuntimeError(f"La migración {version}_{name} cambió después de aplicarse")
+                    continue
+                # Todo el archivo en una transacción; sin parámetros el cursor
+                # acepta varias sentencias y no interpreta los % de format()
+                cur.execute(sql)
+                cur.execute(
+                    "INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s)",
+                    (version, name, _checksum(sql)),
+                )
+                raw.commit()
+                done.append(version)
+                print(f"Migración aplicada: {version}_{name}")
+        except Exception:
+            raw.rollback()
+            raise
+        finally:
+            cur.execute("SELECT pg_advisory_unlock(%s)", (LOCK_KEY,))
+            raw.commit()
+    finally:
+        raw.close()
+    return done
+
+def status(engine=None, folder: str = MIGRATIONS_DIR):
+    engine = engine or get_engine()
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        _ensure_table(cur)
+        applied = _applied(cur)
+        raw.commit()
+    finally:
+        raw.close()
+    for version, name, _ in list_migrations(folder):
+        print(f"{version}_{name}: {'aplicada' if version in applied else 'pendiente'}")
+
+# Particiones de hired_employees por año
+def ensure_year(year: int, engine=None):
+    engine = engine or get_engine()
+    with engine.begin() as conn:
+        conn.execute(text("SELECT ensure_hired_partition(:y)"), {"y": year})
+    print(f"Partición hired_employees_y{year} lista")
+
+def detach_year(year: int, engine=None):
+    """
+    Separa la partición de un año: queda como tabla común
+    (hired_employees_yAAAA) para archivarla o borrarla con DROP TABLE, y sus
+    filas salen del agregado de métricas y sus ids quedan libres.
+    """
+    engine = engine or get_engine()
+    part = f"hired_employees_y{int(year)}"
+    with engine.begin() as conn:
+        conn.execute(text(f"ALTER TABLE hired_employees DETACH PARTITION {part}"))
+        conn.execute(text(f"DELETE FROM hired_employee_ids i USING {part} p WHERE i.id = p.id"))
+        conn.execute(text(f"DELETE FROM {AGG_TABLE} WHERE year = :y"), {"y": year})
+    print(f"Partición hired_employees_y{year} separada")
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Migraciones del esquema")
+    p.add_argument("--status", action="store_true", help="Lista migraciones aplicadas y pendientes")
+    p.add_argument("--ensure-year", type=int, help="Crea la partición de hired_employees de ese año")
+    p.add_argument("--detach-year", type=int, help="Separa la partición de ese año para archivarla")
+    return p.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.status:
+        status()
+    elif args.ensure_year:
+        ensure_year(args.ensure_year)
+    elif args.detach_year:
+        detach_year(args.detach_year)
+    else:
+        applied = migrate()
+        if not applied:
+            print("Esquema al día")
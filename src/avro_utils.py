@@ -1,21 +1,11 @@
 import os
-from typing import List, Dict
+from typing import Dict, Iterator
 from datetime import datetime
-from fastavro import writer, reader, parse_schema
-from sqlalchemy import create_engine, text
-from dotenv import load_dotenv
-from sqlalchemy import text as sqltext
-
-# Carga de variables de entorno
-load_dotenv()
-engine = create_engine(os.getenv("DATABASE_URL"), pool_pre_ping=True)
-
-# Diccionario de datos
-SCHEMAS = {
-    "departments": ["id", "name"],
-    "jobs": ["id", "name"],
-    "hired_employees": ["id", "name", "datetime", "department_id", "job_id"],
-}
+from fastavro import writer, parse_schema
+from sqlalchemy import text
+from src.db import get_engine
+from src.restore_engine import restore_files
+from src.validation import SCHEMAS
 
 # Función para obtener el schema AVRO
 def _avro_schema_for(table: str) -> Dict:
@@ -47,68 +37,80 @@ def _avro_schema_for(table: str) -> Dict:
         "fields": fields
     }
 
-# Función para exportar a AVRO
-def backup_avro(table: str, out_dir="backups") -> str:
-    cols = SCHEMAS[table]
-    os.makedirs(out_dir, exist_ok=True)
-
-    with engine.connect() as conn:
-        res = conn.execute(text(f"SELECT {', '.join(cols)} FROM {table}"))
-        rows = [dict(r._mapping) for r in res]
+# Codecs de compresión soportados por fastavro
+# (snappy requiere cramjam y zstandard requiere su librería instalada)
+CODECS = ("null", "deflate", "snappy", "zstandard")
+DEFAULT_CODEC = "deflate"
+DEFAULT_SYNC_INTERVAL = 64_000 # Bytes aproximados por bloque Avro
+YIELD_PER = 10_000 # Filas por fetch del cursor del servidor
 
-    # Normalizar datetime de hired_employees a string YYYY-MM-DD HH:MM:SS
-    if table == "hired_employees":
-        for r in rows:
-            v = r.get("datetime")
+# Registros leídos en streaming; datetime se convierte registro a registro
+def _iter_records(conn, table: str, since_id: int = None) -> Iterator[Dict]:
+    cols = SCHEMAS[table]
+    where = "" if since_id is None else "WHERE id > :since_id "
+    res = conn.execution_options(stream_results=True).execute(
+        text(f"SELECT {', '.join(cols)} FROM {table} {where}ORDER BY id"),
+        {"since_id": since_id},
+    ).yield_per(YIELD_PER)
+    for r in res:
+        rec = dict(r._mapping)
+        # Normalizar datetime de hired_employees a string YYYY-MM-DD HH:MM:SS
+        if table == "hired_employees":
+            v = rec["datetime"]
             if v is None:
-                r["datetime"] = ""
-            elif isinstance(v, str):
-                pass
-            else:
-                r["datetime"] = v.strftime("%Y-%m-%d %H:%M:%S")
+                rec["datetime"] = ""
+            elif not isinstance(v, str):
+                rec["datetime"] = v.strftime("%Y-%m-%d %H:%M:%S")
+        yield rec
+
+# Escribe la tabla en `out` (archivo binario abierto); retorna filas y marca de agua
+def write_avro(conn, table: str, out, codec: str = DEFAULT_CODEC,
+               sync_interval: int = DEFAULT_SYNC_INTERVAL, since_id: int = None) -> Dict:
+    stats = {"rows": 0, "max_id": None, "max_datetime": None}
+
+    def tracked(records):
+        for rec in records:
+            stats["rows"] += 1
+            stats["max_id"] = rec["id"]  # registros ordenados por id
+            v = rec.get("datetime")
+            if v and (stats["max_datetime"] is None or v > stats["max_datetime"]):
+                stats["max_datetime"] = v
+            yield rec
 
     schema = parse_schema(_avro_schema_for(table))
-    ts = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
-    path = os.path.join(out_dir, f"{table}_{ts}.avro")
+    writer(out, schema, tracked(_iter_records(conn, table, since_id)),
+           codec=codec, sync_interval=sync_interval)
+    return stats
 
-    with open(path, "wb") as out:
-        writer(out, schema, rows)
-
-    return path
+# Función para exportar a AVRO
+def backup_avro(table: str, out_dir="backups", codec: str = DEFAULT_CODEC,
+                sync_interval: int = DEFAULT_SYNC_INTERVAL, since_id: int = None) -> tuple:
+    """
+    Memoria constante: cursor del servidor -> generador -> bloques Avro.
+    Retorna (path, stats); un incremental sin filas nuevas no deja archivo.
+    Un codec desconocido o sin su librería instalada lanza ValueError y no deja archivo.
+    """
+    if codec not in CODECS:
+        raise ValueError(f"codec no soportado: {codec}")
+    os.makedirs(out_dir, exist_ok=True)
+    ts = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+    suffix = "" if since_id is None else f"_inc{since_id}"
+    path = os.path.join(out_dir, f"{table}_{ts}{suffix}.avro")
+
+    try:
+        with get_engine().connect() as conn, open(path, "wb") as out:
+            stats = write_avro(conn, table, out, codec, sync_interval, since_id)
+    except Exception:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+
+    if since_id is not None and stats["rows"] == 0:
+        os.remove(path)
+        return None, stats
+    return path, stats
 
 # Función para restaurar desde un AVRO
-def restore_avro(table: str, path: str, batch_size: int = 1000) -> int:
-    if not os.path.exists(path):
-        raise FileNotFoundError(f"No existe: {path}")
-
-    cols = SCHEMAS[table]
-    inserted = 0
-
-    placeholders = ", ".join([f":{c}" for c in cols])
-    collist = ", ".join(cols)
-    insert_sql = sqltext(f"INSERT INTO {table} ({collist}) VALUES ({placeholders}) ON CONFLICT (id) DO NOTHING")
-
-    buffer: List[Dict] = []
-    with open(path, "rb") as f, engine.begin() as conn:
-        for rec in reader(f):
-            if table in ("departments", "jobs"):
-                rec["id"] = int(rec["id"])
-                rec["name"] = str(rec["name"])
-            else:
-                rec["id"] = int(rec["id"])
-                rec["name"] = str(rec["name"])
-                rec["datetime"] = str(rec["datetime"])
-                rec["department_id"] = int(rec["department_id"])
-                rec["job_id"] = int(rec["job_id"])
-
-            buffer.append(rec)
-            if len(buffer) >= batch_size:
-                conn.execute(insert_sql, buffer)
-                inserted += len(buffer)
-                buffer.clear()
-
-        if buffer:
-            conn.execute(insert_sql, buffer)
-            inserted += len(buffer)
-
-    return inserted
+def restore_avro(table: str, path: str, workers: int = 1) -> int:
+    """Restaura vía el motor compartido (COPY + merge). Retorna filas leídas."""
+    return restore_files(get_engine(), table, [path], workers=workers)["leidas"]
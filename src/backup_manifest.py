@@ -0,0 +1,116 @@
+import os
+import json
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+from sqlalchemy import text
+
+# Manifiesto de backups: por tabla, la lista ordenada de backups completos e
+# incrementales con su marca de agua (máximo id / datetime exportado)
+MANIFEST_PATH = os.path.join("backups", "manifest.json")
+
+_lock = threading.Lock()
+
+def load_manifest() -> Dict[str, List[Dict]]:
+    if not os.path.exists(MANIFEST_PATH):
+        return {}
+    with open(MANIFEST_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+def _save_manifest(manifest: Dict):
+    # Escritura atómica para no dejar el manifiesto a medias
+    os.makedirs(os.path.dirname(MANIFEST_PATH), exist_ok=True)
+    tmp = MANIFEST_PATH + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, MANIFEST_PATH)
+
+# Última entrada de la tabla (base para el siguiente incremental)
+def last_entry(table: str) -> Optional[Dict]:
+    entries = load_manifest().get(table, [])
+    return entries[-1] if entries else None
+
+# Registra un backup ya escrito; un incremental cuelga del último completo
+def record_backup(table: str, path: str, fmt: str, stats: Dict, since_id: Optional[int]) -> Dict:
+    with _lock:
+        manifest = load_manifest()
+        entries = manifest.setdefault(table, [])
+        if since_id is None:
+            kind, base = "full", path
+        else:
+            kind, base = "incremental", entries[-1]["base"]
+        max_dt = stats.get("max_datetime")
+        entry = {
+            "path": path,
+            "format": fmt,
+            "kind": kind,
+            "base": base,
+            "since_id": since_id,
+            "hwm": {"id": stats.get("max_id"), "datetime": None if max_dt is None else str(max_dt)},
+            "rows": stats.get("rows", 0),
+            "created": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
+        }
+        entries.append(entry)
+        _save_manifest(manifest)
+        return entry
+
+# Desde qué id exportar en un incremental (None -> no hay base: hacer completo)
+def incremental_since(table: str) -> Optional[int]:
+    entry = last_entry(table)
+    if entry is None:
+        return None
+    if entry["hwm"]["id"] is None:
+        return entry["since_id"]  # incremental vacío: se mantiene la misma marca
+    return entry["hwm"]["id"]
+
+# Filas acumuladas de la cadena actual (último completo y sus incrementales)
+def chain_rows(table: str) -> int:
+    entries = load_manifest().get(table, [])
+    if not entries:
+        return 0
+    base = entries[-1]["base"]
+    return sum(e["rows"] for e in entries if e["base"] == base)
+
+def checked_incremental_since(engine, table: str) -> Optional[int]:
+    """
+    Igual que incremental_since, pero verifica la cadena contra la base.
+    Los ids los asignan los productores (/ingest acepta cualquiera): una
+    fila que llega tarde con id menor a la marca nunca entraría en un
+    incremental. Si count(*) con id <= marca difiere de las filas de la
+    cadena (filas tardías o borradas), retorna None: backup completo.
+    """
+    since_id = incremental_since(table)
+    if since_id is None:
+        return None
+    with engine.connect() as conn:
+        n = conn.execute(text(f"SELECT count(*) FROM {table} WHERE id <= :id"), {"id": since_id}).scalar()
+    return since_id if n == chain_rows(table) else None
+
+# Cadena a restaurar: el completo y sus incrementales, en orden
+def restore_chain(table: str, path: Optional[str] = None) -> List[str]:
+    """
+    Sin `path`: la cadena del último backup completo.
+    Con `path` de un completo: ese completo y todos sus incrementales.
+    Con `path` de un incremental: su completo y los incrementales hasta él.
+    """
+    entries = load_manifest().get(table, [])
+    if not entries:
+        raise FileNotFoundError(f"No hay backups registrados para {table}")
+
+    if path is None:
+        base, stop = entries[-1]["base"], None
+    else:
+        match = [e for e in entries if e["path"] == path]
+        if not match:
+            raise FileNotFoundError(f"{path} no está en el manifiesto")
+        base = match[0]["base"]
+        stop = path if match[0]["kind"] == "incremental" else None
+
+    chain = []
+    for e in entries:
+        if e["base"] != base:
+            continue
+        chain.append(e["path"])
+        if e["path"] == stop:
+            break
+    return chain
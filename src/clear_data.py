@@ -1,13 +1,24 @@
 import os
-from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
+import sys
+from sqlalchemy import text
 
-load_dotenv()
-engine = create_engine(os.getenv("DATABASE_URL"), pool_pre_ping=True)
+# Permite ejecutar como script (python src/clear_data.py) o como módulo
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.db import get_engine
 
-tables = ["hired_employees", "departments", "jobs"]
+engine = get_engine()
+
+tables = ["hired_employees", "hired_employee_ids", "departments", "jobs", "hires_by_year_quarter_dept_job"]
 
 with engine.begin() as conn:
     for t in tables:
         conn.execute(text(f"TRUNCATE TABLE {t} RESTART IDENTITY CASCADE"))
         print(f"Tabla {t} vaciada.")
+
+
+# Los checkpoints de la carga histórica ya no aplican a tablas vacías
+CHECKPOINT_PATH = "logs/checkpoints.json"
+if os.path.exists(CHECKPOINT_PATH):
+    os.remove(CHECKPOINT_PATH)
+    print(f"Checkpoints {CHECKPOINT_PATH} eliminados.")
@@ -1,15 +1,235 @@
 import os
+import time
+import threading
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from src.telemetry import POOL_TIMEOUTS, POOL_WAIT_SECONDS, registry
+
+# Pool de conexiones compartido por la API y los scripts (load_historico,
+# avro_utils, clear_data, verify_schema): un solo motor por proceso, creado
+# en el primer uso, con estadísticas de espera y edad de conexiones
 
 load_dotenv() # Cargar variables .env
 DATABASE_URL = os.getenv("DATABASE_URL") # Database
-engine = create_engine(DATABASE_URL, pool_pre_ping=True) # Motor de conexión
+
+# Configuración por .env (Neon limita las conexiones y suspende el cómputo inactivo)
+# Cada proceso abre hasta dos pools (sync y async), cada uno con su tamaño
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))                            # Pool sync (scripts, endpoints sync)
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+ASYNC_POOL_SIZE = int(os.getenv("DB_ASYNC_POOL_SIZE", "10"))               # Pool async (/ingest, /metrics)
+ASYNC_MAX_OVERFLOW = int(os.getenv("DB_ASYNC_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))                   # Espera máxima por una conexión (s)
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "300"))                    # Reabrir conexiones más viejas (s)
+KEEPALIVE_IDLE = int(os.getenv("DB_KEEPALIVE_IDLE", "30"))                 # TCP keepalive (s)
+STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000")) # 0 = sin límite
+PREPARED_CACHE = int(os.getenv("DB_PREPARED_CACHE", "500"))               # 0 si hay pgbouncer en modo transacción
+
+def clean_db_url(url: str | None) -> str:
+    """
+    Asegura sslmode=require y desactiva channel_binding si está en 'require',
+    lo que a veces rompe en clientes no interactivos.
+    """
+    if not url:
+        raise RuntimeError("DATABASE_URL no está definido")
+    # normalizamos sslmode
+    if "sslmode=" not in url:
+        sep = "&" if "?" in url else "?"
+        url = f"{url}{sep}sslmode=require"
+    # evitamos channel_binding=require (opcional)
+    url = url.replace("channel_binding=require", "channel_binding=disable")
+    return url
+
+# Estadísticas del pool: espera al pedir una conexión y edad de las conexiones
+class PoolStats:
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.connects = 0
+        self.opened = {}  # id de la conexión -> momento de apertura
+
+    def record_wait(self, secs: float, timed_out: bool = False):
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += timed_out
+            self.wait_total += secs
+            self.wait_max = max(self.wait_max, secs)
+        POOL_WAIT_SECONDS.observe(secs, self.name)
+        if timed_out:
+            POOL_TIMEOUTS.inc(1, self.name)
+
+    def snapshot(self, pool) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            ages = [now - t for t in self.opened.values()]
+            return {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "overflow": max(pool.overflow(), 0),
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": round(1000 * self.wait_total / self.checkouts, 3) if self.checkouts else 0.0,
+                "wait_max_ms": round(1000 * self.wait_max, 3),
+                "connects": self.connects,
+                "open_connections": len(ages),
+                "conn_age_avg_s": round(sum(ages) / len(ages), 1) if ages else 0.0,
+                "conn_age_max_s": round(max(ages), 1) if ages else 0.0,
+            }
+
+# QueuePool que mide cuánto espera cada checkout
+class _TimedPoolMixin:
+    stats: PoolStats
+
+    def _do_get(self):
+        t0 = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeout:
+            self.stats.record_wait(time.perf_counter() - t0, timed_out=True)
+            raise
+        self.stats.record_wait(time.perf_counter() - t0)
+        return conn
+
+    def recreate(self):
+        new = super().recreate()
+        new.stats = self.stats
+        return new
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+def _instrument(engine, stats: PoolStats):
+    engine.pool.stats = stats
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, record):
+        with stats._lock:
+            stats.connects += 1
+            stats.opened[id(record)] = time.monotonic()
+
+    @event.listens_for(engine, "close")
+    def _on_close(dbapi_conn, record):
+        with stats._lock:
+            stats.opened.pop(id(record), None)
+
+_engine = None
+_async_engine = None
+_stats = {"sync": PoolStats("sync"), "async": PoolStats("async")}
+_lock = threading.Lock()
+
+# Motor sync (psycopg2) compartido; se crea en el primer uso
+def get_engine():
+    global _engine
+    if _engine is None:
+        with _lock:
+            if _engine is None:
+                # Keepalive TCP: detecta conexiones cortadas por el proxy de Neon
+                connect_args = {
+                    "keepalives": 1,
+                    "keepalives_idle": KEEPALIVE_IDLE,
+                    "keepalives_interval": 10,
+                    "keepalives_count": 3,
+                    "application_name": "data-api",
+                }
+                eng = create_engine(
+                    clean_db_url(DATABASE_URL),
+                    poolclass=TimedQueuePool,
+                    pool_size=POOL_SIZE,
+                    max_overflow=MAX_OVERFLOW,
+                    pool_timeout=POOL_TIMEOUT,
+                    pool_recycle=POOL_RECYCLE,
+                    pool_pre_ping=True,
+                    connect_args=connect_args,
+                )
+                _instrument(eng, _stats["sync"])
+                _engine = eng
+    return _engine
+
+def _async_db_url(url: str) -> tuple:
+    """
+    Pasa la URL al driver asyncpg. asyncpg no entiende sslmode ni
+    channel_binding en la URL: se quitan y sslmode se pasa como `ssl`.
+    """
+    parts = urlsplit(clean_db_url(url))
+    scheme = "postgresql+asyncpg"
+    query = dict(parse_qsl(parts.query))
+    sslmode = query.pop("sslmode", "require")
+    query.pop("channel_binding", None)
+    query["prepared_statement_cache_size"] = str(PREPARED_CACHE)
+    return urlunsplit((scheme, parts.netloc, parts.path, urlencode(query), parts.fragment)), sslmode
+
+# Motor async (asyncpg) para los endpoints async; se crea dentro del event loop
+def get_async_engine():
+    global _async_engine
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import create_async_engine
+        url, sslmode = _async_db_url(DATABASE_URL)
+        server_settings = {"application_name": "data-api"}
+        if STATEMENT_TIMEOUT_MS:
+            server_settings["statement_timeout"] = str(STATEMENT_TIMEOUT_MS)
+        eng = create_async_engine(
+            url,
+            poolclass=TimedAsyncQueuePool,
+            pool_size=ASYNC_POOL_SIZE,
+            max_overflow=ASYNC_MAX_OVERFLOW,
+            pool_timeout=POOL_TIMEOUT,
+            pool_recycle=POOL_RECYCLE,
+            pool_pre_ping=True,
+            connect_args={"ssl": sslmode, "server_settings": server_settings},
+        )
+        _instrument(eng.sync_engine, _stats["async"])
+        _async_engine = eng
+    return _async_engine
+
+async def dispose_async_engine():
+    global _async_engine
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+
+# Estadísticas de los pools creados en este proceso
+def pool_stats() -> dict:
+    out = {}
+    if _engine is not None:
+        out["sync"] = _stats["sync"].snapshot(_engine.pool)
+    if _async_engine is not None:
+        out["async"] = _stats["async"].snapshot(_async_engine.sync_engine.pool)
+    return out
+
+# Estado de los pools en /telemetry (se lee al exportar)
+def _pool_gauges():
+    stats = pool_stats()
+    return [
+        (f"db_pool_{key}", "gauge", help, ("pool",), [((pool,), s[key]) for pool, s in stats.items()])
+        for key, help in (
+            ("size", "Conexiones fijas del pool"),
+            ("checked_out", "Conexiones en uso"),
+            ("overflow", "Conexiones abiertas por encima de pool_size"),
+            ("open_connections", "Conexiones abiertas"),
+        )
+    ]
+
+registry.collector(_pool_gauges)
+
+# Compatibilidad: `from src.db import engine`
+def __getattr__(name):
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(name)
 
 # Función para probar la conexión
 def test_connection():
     try:
-        with engine.connect() as conn:
+        with get_engine().connect() as conn:
             result = conn.execute(text("SELECT 1"))
             print("Conexión exitosa:", list(result))
     except Exception as e:
@@ -0,0 +1,121 @@
+import time
+import threading
+from typing import Dict, Iterable, Optional, Set, Tuple
+from sqlalchemy import text
+
+# Caché en memoria de los ids de las dimensiones (departments, jobs) para el
+# chequeo de FK de /ingest: un acierto no toca la base; un id ausente se
+# re-verifica contra la base (pudo crearlo otro proceso) y se agrega.
+
+DIMENSIONS = ("departments", "jobs")
+VERSION_CHECK_SECONDS = 60 # Cada cuánto comparar la versión (count, max id) con la base
+
+class DimensionCache:
+    def __init__(self, tables=DIMENSIONS, check_every: float = VERSION_CHECK_SECONDS):
+        self.tables = tuple(tables)
+        self.check_every = check_every
+        self._ids: Dict[str, Set[int]] = {}
+        self._version: Dict[str, tuple] = {}
+        self._checked: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    # Carga completa de una dimensión (arranque, invalidación o versión distinta)
+    def _load(self, conn, table: str):
+        ids = set(conn.execute(text(f"SELECT id FROM {table}")).scalars())
+        version = (len(ids), max(ids) if ids else None)
+        with self._lock:
+            self._ids[table] = ids
+            self._version[table] = version
+            self._checked[table] = time.monotonic()
+
+    def load(self, engine):
+        with engine.connect() as conn:
+            for t in self.tables:
+                self._load(conn, t)
+
+    # Versión barata: si cambió (altas/bajas desde otro proceso) se recarga
+    def _refresh_if_stale(self, conn, table: str):
+        with self._lock:
+            loaded = table in self._ids
+            version = self._version.get(table)
+            checked = self._checked.get(table, 0)
+        if not loaded:
+            self._load(conn, table)
+            return
+        if time.monotonic() - checked < self.check_every:
+            return
+        row = conn.execute(text(f"SELECT count(*), max(id) FROM {table}")).one()
+        if tuple(row) != version:
+            self._load(conn, table)
+        else:
+            with self._lock:
+                self._checked[table] = time.monotonic()
+
+    # Todo lo pedido está cacheado y fresco: resultado sin tocar la base (o None).
+    # Las lecturas van bajo el lock: invalidate() (/restore) borra entradas
+    # y add() modifica los sets desde otros hilos.
+    def _cached(self, wanted: Dict[str, Set[int]]) -> Optional[Dict[str, Set[int]]]:
+        now = time.monotonic()
+        with self._lock:
+            for t, ids in wanted.items():
+                known = self._ids.get(t)
+                if known is None or now - self._checked.get(t, 0) >= self.check_every or not ids <= known:
+                    return None
+        return wanted
+
+    # (cacheados, faltantes) de una dimensión, o None si no está cargada
+    def _split(self, table: str, ids: Set[int]) -> Optional[Tuple[Set[int], Set[int]]]:
+        with self._lock:
+            known = self._ids.get(table)
+            return None if known is None else (ids & known, ids - known)
+
+    def _lookup(self, conn, wanted: Dict[str, Set[int]]) -> Dict[str, Set[int]]:
+        out = {}
+        for t, ids in wanted.items():
+            self._refresh_if_stale(conn, t)
+            split = self._split(t, ids)
+            if split is None:  # invalidada entre medio: se recarga
+                self._load(conn, t)
+                split = self._split(t, ids) or (set(), ids)
+            hit, miss = split
+            if miss:
+                found = conn.execute(
+                    text(f"SELECT id FROM {t} WHERE id = ANY(:ids)"), {"ids": list(miss)}
+                ).scalars().all()
+                self.add(t, found)
+                hit |= set(found)
+            out[t] = hit
+        return out
+
+    # Ids existentes por dimensión; solo consulta la base por ids no cacheados
+    def existing(self, engine, wanted: Dict[str, Iterable[int]]) -> Dict[str, Set[int]]:
+        wanted = {t: set(ids) for t, ids in wanted.items()}
+        hit = self._cached(wanted)
+        if hit is not None:
+            return hit
+        with engine.connect() as conn:
+            return self._lookup(conn, wanted)
+
+    # Igual que existing, sobre el motor async (misma lógica vía run_sync)
+    async def aexisting(self, async_engine, wanted: Dict[str, Iterable[int]]) -> Dict[str, Set[int]]:
+        wanted = {t: set(ids) for t, ids in wanted.items()}
+        hit = self._cached(wanted)
+        if hit is not None:
+            return hit
+        async with async_engine.connect() as conn:
+            return await conn.run_sync(self._lookup, wanted)
+
+    # Escrituras conocidas en este proceso
+    def add(self, table: str, ids: Iterable[int]):
+        with self._lock:
+            if table in self._ids:
+                self._ids[table].update(ids)
+
+    def invalidate(self, table: str = None):
+        with self._lock:
+            for t in ([table] if table else list(self._ids)):
+                self._ids.pop(t, None)
+                self._version.pop(t, None)
+                self._checked.pop(t, None)
+
+dim_cache = DimensionCache()
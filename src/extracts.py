@@ -0,0 +1,177 @@
+import json
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import text
+
+from src.parquet_utils import SCHEMAS, StreamSink, arrow_schema, batch_from_rows
+
+try:
+    import orjson
+except ImportError:  # opcional: sin orjson se serializa con json de la stdlib
+    orjson = None
+
+# Extracciones paginadas de las tablas (GET /tables/{table}).
+# Paginación keyset: una página son las filas con id > cursor en orden de id,
+# así que la página N cuesta lo mismo que la primera (no hay OFFSET que
+# recorrer). Las filas salen de un cursor del servidor y se envían por lotes:
+# la memoria depende del lote, no del tamaño de la página.
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+PAGE_ROWS = 10_000         # Filas por página por defecto
+MAX_PAGE_ROWS = 1_000_000
+BATCH_ROWS = 5_000         # Filas por lote leído del cursor y enviado al cliente
+
+# Filtros de fecha/departamento/job: solo hired_employees
+FILTERED = ("hired_employees",)
+
+# expand=true agrega las columnas de script_view_looker.txt
+EXPAND_COLS = ["department_name", "job_name", "year", "quarter"]
+_EXPAND_SELECT = (
+    "d.name AS department_name, j.name AS job_name, "
+    "EXTRACT(YEAR FROM t.datetime)::int AS year, "
+    "EXTRACT(QUARTER FROM t.datetime)::int AS quarter"
+)
+_EXPAND_JOIN = (
+    "LEFT JOIN departments d ON d.id = t.department_id "
+    "LEFT JOIN jobs j ON j.id = t.job_id"
+)
+
+# La columna es timestamp sin zona: las fechas con zona se pasan a UTC
+def _naive_utc(ts: datetime) -> datetime:
+    return ts.astimezone(timezone.utc).replace(tzinfo=None) if ts.tzinfo else ts
+
+def build_where(table: str, after: Optional[int] = None, since: Optional[datetime] = None,
+                until: Optional[datetime] = None, department_id: Optional[List[int]] = None,
+                job_id: Optional[List[int]] = None) -> Tuple[List[str], Dict]:
+    """
+    Condiciones y parámetros de la página. `since` es inclusivo y `until`
+    exclusivo; con filtro por fecha el planner solo lee las particiones del
+    rango. Lanza ValueError si se filtra una tabla que no lo admite.
+    """
+    if table not in FILTERED and (since or until or department_id or job_id):
+        raise ValueError(f"{table} solo admite paginación por id")
+    where, params = [], {}
+    if after is not None:
+        where.append("t.id > :after")
+        params["after"] = after
+    if since:
+        where.append("t.datetime >= :since")
+        params["since"] = _naive_utc(since)
+    if until:
+        where.append("t.datetime < :until")
+        params["until"] = _naive_utc(until)
+    if department_id:
+        where.append("t.department_id = ANY(:department_id)")
+        params["department_id"] = list(department_id)
+    if job_id:
+        where.append("t.job_id = ANY(:job_id)")
+        params["job_id"] = list(job_id)
+    return where, params
+
+def _where_sql(where: List[str]) -> str:
+    return ("WHERE " + " AND ".join(where)) if where else ""
+
+# Última id de la página y cursor de la siguiente (None si no hay más)
+def page_bounds(conn, table: str, where: List[str], params: Dict, limit: int) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Se calcula antes de enviar el cuerpo para poder mandar el cursor en el
+    encabezado: recorre solo el índice de id desde el cursor, hasta la fila
+    `limit` + 1.
+    """
+    ids = conn.execute(
+        text(f"SELECT t.id FROM {table} t {_where_sql(where)} ORDER BY t.id OFFSET :skip LIMIT 2"),
+        {**params, "skip": limit - 1},
+    ).scalars().all()
+    if not ids:
+        return None, None
+    return ids[0], (ids[0] if len(ids) == 2 else None)
+
+def page_columns(table: str, expand: bool = False) -> List[str]:
+    if expand and table not in FILTERED:
+        raise ValueError(f"expand no aplica a {table}")
+    return SCHEMAS[table] + (EXPAND_COLS if expand else [])
+
+def page_sql(table: str, where: List[str], expand: bool = False) -> str:
+    select = ", ".join(f"t.{c}" for c in SCHEMAS[table])
+    join = ""
+    if expand:
+        select += ", " + _EXPAND_SELECT
+        join = _EXPAND_JOIN
+    return f"SELECT {select} FROM {table} t {join} {_where_sql(where)} ORDER BY t.id LIMIT :limit"
+
+# Lotes de filas (tuplas) con un cursor del servidor
+def _iter_rows(engine, sql: str, params: Dict, batch_rows: int) -> Iterator[list]:
+    with engine.connect() as conn:
+        res = conn.execution_options(stream_results=True).execute(text(sql), params).yield_per(batch_rows)
+        for rows in res.partitions():
+            yield rows
+
+# Serializadores: cada uno emite bytes por lote
+def _iter_ndjson(batches: Iterator[list], cols: List[str]) -> Iterator[bytes]:
+    if orjson is not None:
+        dumps = orjson.dumps
+    else:
+        def dumps(obj):
+            return json.dumps(obj, ensure_ascii=False, default=datetime.isoformat).encode("utf-8")
+    for rows in batches:
+        yield b"".join(dumps(dict(zip(cols, r))) + b"\n" for r in rows)
+
+def _schema(table: str, expand: bool) -> pa.Schema:
+    base = arrow_schema(SCHEMAS[table])
+    if not expand:
+        return base
+    # Los nombres vienen de un LEFT JOIN: pueden ser null
+    return pa.schema(list(base) + list(arrow_schema(EXPAND_COLS, nullable=True)))
+
+def _iter_arrow(batches: Iterator[list], schema: pa.Schema) -> Iterator[bytes]:
+    sink = StreamSink()
+    with pa.ipc.new_stream(sink, schema) as w:
+        for rows in batches:
+            w.write_batch(batch_from_rows(rows, schema))
+            yield sink.drain()
+    yield sink.drain()  # marca de fin del stream
+
+def _iter_parquet(batches: Iterator[list], schema: pa.Schema, compression: str) -> Iterator[bytes]:
+    sink = StreamSink()
+    codec = None if compression == "none" else compression
+    with pq.ParquetWriter(sink, schema, compression=codec) as w:
+        for rows in batches:
+            w.write_batch(batch_from_rows(rows, schema))
+            data = sink.drain()
+            if data:
+                yield data
+    yield sink.drain()  # footer
+
+def open_page(engine, table: str, fmt: str = "ndjson", limit: int = PAGE_ROWS,
+              after: Optional[int] = None, since: Optional[datetime] = None,
+              until: Optional[datetime] = None, department_id: Optional[List[int]] = None,
+              job_id: Optional[List[int]] = None, expand: bool = False,
+              compression: str = "snappy", batch_rows: int = BATCH_ROWS) -> Tuple[Iterator[bytes], Optional[int]]:
+    """
+    Retorna (cuerpo, cursor siguiente). El cuerpo es un generador: la
+    consulta de la página se ejecuta recién al recorrerlo, con su propia
+    conexión del pool.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"formato no soportado: {fmt}")
+    cols = page_columns(table, expand)
+    where, params = build_where(table, after, since, until, department_id, job_id)
+    with engine.connect() as conn:
+        last_id, cursor = page_bounds(conn, table, where, params, limit)
+    if last_id is not None:
+        # Página acotada por ambos extremos: coincide con el cursor anunciado
+        where = where + ["t.id <= :last_id"]
+        params = {**params, "last_id": last_id}
+    batches = _iter_rows(engine, page_sql(table, where, expand), {**params, "limit": limit}, batch_rows)
+    if fmt == "ndjson":
+        return _iter_ndjson(batches, cols), cursor
+    schema = _schema(table, expand)
+    if fmt == "arrow":
+        return _iter_arrow(batches, schema), cursor
+    return _iter_parquet(batches, schema, compression), cursor
@@ -0,0 +1,133 @@
+import os
+import time
+import queue
+import threading
+from concurrent.futures import Future
+from typing import List, Tuple
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
+from src.pg_bulk import ensure_partitions, ensure_staging, copy_merge
+from src.telemetry import Stages, record_stages
+from src.validation import SCHEMAS
+
+# Cola de escritura diferida (write-behind) con group commit: junta filas ya
+# validadas de varios requests concurrentes y las escribe en una sola
+# transacción (COPY a staging + merge), un commit/fsync para todo el grupo.
+
+FLUSH_ROWS = int(os.getenv("INGEST_FLUSH_ROWS", "20000")) # Filas que disparan un commit
+FLUSH_MS = float(os.getenv("INGEST_FLUSH_MS", "50"))       # Espera máxima antes de un commit
+MAX_PENDING = 64                                           # Lotes en cola (contrapresión)
+
+class GroupCommitter:
+    def __init__(self, engine, flush_rows: int = FLUSH_ROWS, flush_ms: float = FLUSH_MS,
+                 max_pending: int = MAX_PENDING, on_commit=None):
+        self.engine = engine
+        self.flush_rows = flush_rows
+        self.flush_ms = flush_ms
+        self.on_commit = on_commit  # callback(table, tbl) tras cada commit
+        self._q: "queue.Queue" = queue.Queue(maxsize=max_pending)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+            self._thread.start()
+
+    # Escribe lo pendiente y detiene el hilo
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    # Encola un lote validado; el Future se resuelve cuando el lote es durable
+    def submit(self, table: str, tbl: pa.Table) -> Future:
+        fut: Future = Future()
+        if tbl.num_rows == 0:
+            fut.set_result(0)
+            return fut
+        if self._thread is None:
+            raise RuntimeError("GroupCommitter no iniciado")
+        self._q.put((table, tbl.select(SCHEMAS[table]), fut))
+        return fut
+
+    def _run(self):
+        while not (self._stop.is_set() and self._q.empty()):
+            try:
+                first = self._q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            group, rows = [first], first[1].num_rows
+            deadline = time.monotonic() + self.flush_ms / 1000
+            while rows < self.flush_rows:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    break
+                try:
+                    item = self._q.get(timeout=left)
+                except queue.Empty:
+                    break
+                group.append(item)
+                rows += item[1].num_rows
+            self._flush(group)
+
+    # Un commit para todo el grupo; si falla, cada lote se reintenta solo
+    # para que un lote problemático no arrastre a los demás requests
+    def _flush(self, group: List[Tuple[str, pa.Table, Future]]):
+        try:
+            self._write(group)
+        except Exception as e:
+            if len(group) == 1:
+                group[0][2].set_exception(e)
+                return
+            for item in group:
+                try:
+                    self._write([item])
+                except Exception as e:
+                    item[2].set_exception(e)
+
+    def _write(self, group: List[Tuple[str, pa.Table, Future]]):
+        # Dimensiones primero: un empleado puede referir a un job del mismo grupo
+        by_table = {t: [g for g in group if g[0] == t] for t in SCHEMAS}
+        stages = {t: Stages() for t, items in by_table.items() if items}
+        for table, items in by_table.items():
+            for _, tbl, _ in items:
+                ensure_partitions(self.engine, table, tbl)
+        raw = self.engine.raw_connection()
+        try:
+            cur = raw.cursor()
+            for table, st in stages.items():
+                cols = SCHEMAS[table]
+                ensure_staging(cur, table)
+                with st.time("encode"):
+                    tbl = pa.concat_tables([i[1] for i in by_table[table]])
+                    sink = pa.BufferOutputStream()
+                    pacsv.write_csv(tbl, sink, pacsv.WriteOptions(include_header=False))
+                with st.time("insert"):
+                    copy_merge(cur, table, cols, pa.BufferReader(sink.getvalue()))
+            t0 = time.perf_counter()
+            raw.commit()
+        except Exception:
+            raw.rollback()
+            raise
+        finally:
+            raw.close()
+        # El commit es uno por grupo: se atribuye a cada tabla que participó
+        commit_secs = time.perf_counter() - t0
+        for table, st in stages.items():
+            st.seconds["commit"] = commit_secs
+            record_stages("group_commit", table, st)
+        for _, tbl, fut in group:
+            if not fut.done():
+                fut.set_result(tbl.num_rows)
+        if self.on_commit is not None:
+            for table, items in by_table.items():
+                if not items:
+                    continue
+                try:
+                    self.on_commit(table, pa.concat_tables([i[1] for i in items]))
+                except Exception as e:  # ya es durable: no debe fallar el grupo
+                    print(f"[group_commit] on_commit {table}: {e}")
@@ -1,17 +1,33 @@
 import os
-import pandas as pd
+import sys
+import json
+import queue
+import multiprocessing
+import hashlib
+import argparse
+import threading
+import time
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.compute as pc
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from dotenv import load_dotenv
-from sqlalchemy import create_engine
 import psycopg2.extras as _extras
 
-# Carga de variables de entorno
-load_dotenv()
-engine = create_engine(os.getenv("DATABASE_URL"), pool_pre_ping=True)
+# Permite ejecutar como script (python src/load_historico.py) o como módulo
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.db import get_engine
+from src.pg_bulk import ensure_partitions, ensure_staging, copy_merge, merge_sql
+from src.rejects import reject_sink
+from src.telemetry import Stages, record_rows, record_stages, registry, stage_totals
+from src.validation import INT_COLS, validate_table
 
 # Configuración de logs
 os.makedirs("logs", exist_ok=True)
-LOG_PATH = "logs/rejected.log"
+CHECKPOINT_PATH = "logs/checkpoints.json"
 
 SCHEMAS = {
     "departments": ["id", "name"],  # Documento sin encabezado
@@ -20,21 +36,35 @@ SCHEMAS = {
 }
 
 BATCH_SIZE = 1000 # Restricción de tamaño de lote según reto
-READ_CHUNK = 100_000 # Filas a verificar por chunk de pandas, no restrictivo en el reto
+READ_BLOCK = 8 << 20 # Bytes por bloque leído (~100k filas de hired_employees), no restrictivo en el reto
+
+# Llaves foráneas verificadas antes de enviar (columna -> tabla de dimensión)
+FOREIGN_KEYS = {
+    "hired_employees": {"department_id": "departments", "job_id": "jobs"},
+}
+
+# Extensiones comprimidas que pyarrow descomprime al vuelo
+COMPRESSED_EXT = (".gz", ".bz2", ".zst", ".zstd", ".lz4")
+
+# Modos de escritura:
+# - "copy": COPY FROM STDIN a staging + merge, una conexión por tabla (por defecto)
+# - "batch": INSERT en lotes de BATCH_SIZE, cumple literalmente el límite del reto
+MODES = ("copy", "batch")
+DEFAULT_MODE = "copy"
 
 # Inserción por lotes
 def insert_batch(table: str, rows: list):
     if not rows:
         return
     cols = SCHEMAS[table]
-    collist = ", ".join(cols)
     tpl = "(" + ",".join(["%s"] * len(cols)) + ")"
-    raw = engine.raw_connection()
+    raw = get_engine().raw_connection()
     try:
         cur = raw.cursor()
+        # Un solo statement por lote (page_size): inserta y actualiza el agregado
         _extras.execute_values(
             cur,
-            f"INSERT INTO {table} ({collist}) VALUES %s ON CONFLICT (id) DO NOTHING",
+            merge_sql(table, cols, "VALUES %s"),
             [tuple(r[c] for c in cols) for r in rows],
             template=tpl,
             page_size=len(rows)
@@ -44,113 +74,432 @@ def insert_batch(table: str, rows: list):
         raw.close()
 
 # Inserción por lotes de 1000 filas
-def insert_in_sublots(table: str, df: pd.DataFrame):
-    if df.empty:
+def insert_in_sublots(table: str, tbl: pa.Table):
+    if tbl.num_rows == 0:
         return
+    for start in range(0, tbl.num_rows, BATCH_SIZE):
+        insert_batch(table, tbl.slice(start, BATCH_SIZE).to_pylist())
+
+# Inserción por COPY de un chunk completo (una transacción por chunk)
+def insert_copy(raw, table: str, tbl: pa.Table) -> int:
+    if tbl.num_rows == 0:
+        return 0
     cols = SCHEMAS[table]
-    n = len(df)
-    for start in range(0, n, BATCH_SIZE):
-        sub_df = df.iloc[start:start + BATCH_SIZE]
-        rows = sub_df.to_dict(orient="records")
-        insert_batch(table, rows)
-
-# Registro de filas rechazadas
-def log_rejected(table: str, rej_df: pd.DataFrame, reason: str):
-    if rej_df.empty:
-        return
-    with open(LOG_PATH, "a", encoding="utf-8") as f:
-        for _, r in rej_df.iterrows():
-            f.write(f"{table} | {reason} | {r.to_dict()}\n")
+    sink = pa.BufferOutputStream()
+    pacsv.write_csv(tbl.select(cols), sink, pacsv.WriteOptions(include_header=False))
+    cur = raw.cursor()
+    try:
+        # En cada transacción: con un pooler en modo transacción (Neon -pooler)
+        # la conexión del servidor puede cambiar entre chunks
+        ensure_staging(cur, table)
+        inserted = copy_merge(cur, table, cols, pa.BufferReader(sink.getvalue()))
+        raw.commit()
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        cur.close()
+    return inserted
+
+# Conexión única por tabla para el modo copy (None en modo batch)
+def open_writer(table: str, mode: str):
+    if mode != "copy":
+        return None
+    return get_engine().raw_connection()
+
+# Escritura de un chunk validado según el modo
+def write_chunk(raw, table: str, tbl: pa.Table, mode: str):
+    ensure_partitions(get_engine(), table, tbl)  # años sin partición irían a la DEFAULT
+    if mode == "copy":
+        insert_copy(raw, table, tbl)
+    else:
+        insert_in_sublots(table, tbl)
+
+# Registro de filas rechazadas (logs/rejects/, escrito en segundo plano)
+def log_rejected(table: str, rej: pa.Table, reason: str):
+    reject_sink.put(table, reason, rej, "load_historico")
+
+# Apertura del archivo: memory-map si es plano, descompresión al vuelo si no
+def open_input(path: str):
+    if path.lower().endswith(COMPRESSED_EXT):
+        return pa.input_stream(path, compression="detect")
+    return pa.memory_map(path, "r")
 
-# Normalización de fechas
-def normalize_datetime_series(series: pd.Series) -> pd.Series:
+# Lectura del archivo en bloques de ~READ_BLOCK bytes cortados en fin de línea
+def iter_blocks(path: str, skip_header: bool, start_chunk: int = 0, start_offset: int = 0):
     """
-    Normaliza cualquier datetime ISO:
-    - acepta 'T', 'Z', micro/milisegundos
-        pandas detecta T/Z/microsegundos; errors='coerce' -> NaT para inválidos
-        utc=False para evitar tz-aware; si viene con tz, lo quita con tz_localize(None)
-    - retorna 'YYYY-MM-DD HH:MM:SS'
-    - valores inválidos -> NaT -> se loggean como rechazados
+    Genera (índice, offset_inicio, offset_fin, bytes).
+    El lector solo corta el archivo por líneas; el parseo y la validación
+    ocurren en los workers. Supone registros de una sola línea (sin saltos
+    de línea dentro de campos entrecomillados).
+    Los offsets son del contenido descomprimido. Con start_offset > 0 salta
+    al primer chunk pendiente (seek si es plano; lectura y descarte si está
+    comprimido, sin parsear ni validar).
     """
-    parsed = pd.to_datetime(series, errors="coerce", utc=False)
-    # Si alguna quedó tz-aware (por 'Z' con heurística), remueve tz
-    try:
-        parsed = parsed.dt.tz_localize(None)
-    except AttributeError:
-        pass
-    # Formato a guardar
-    return parsed.dt.strftime("%Y-%m-%d %H:%M:%S")
+    with open_input(path) as f:
+        offset = 0
+        if start_offset:
+            if f.seekable():
+                f.seek(start_offset)
+                offset = start_offset
+            else:
+                while offset < start_offset:
+                    offset += len(f.read(min(READ_BLOCK, start_offset - offset)))
+        tail = b""
+        if skip_header and not start_offset:
+            while b"\n" not in tail:
+                data = f.read(READ_BLOCK)
+                if not data:
+                    break
+                tail += data
+            cut = tail.find(b"\n") + 1 if b"\n" in tail else len(tail)
+            offset += cut
+            tail = tail[cut:]
 
-# Carga CSV sin encabezado
-def load_csv_no_header(table: str, path: str):
-    total_correct = total_bad = total_seen = 0
+        idx = start_chunk
+        while True:
+            data = f.read(READ_BLOCK)
+            buf = tail + data
+            if not data:
+                if buf:
+                    yield idx, offset, offset + len(buf), buf
+                break
+            cut = buf.rfind(b"\n") + 1
+            if cut == 0:  # línea más larga que el bloque: seguir acumulando
+                tail = buf
+                continue
+            block, tail = buf[:cut], buf[cut:]
+            yield idx, offset, offset + len(block), block
+            offset += len(block)
+            idx += 1
+
+# Parseo de un bloque: tipado primero, texto si hay valores no convertibles
+def parse_block(table: str, data: bytes):
+    """
+    Retorna (tabla, filas_malformadas). Las filas con otro número de columnas
+    se separan como texto crudo para rechazarlas sin perder el bloque.
+    """
     cols = SCHEMAS[table]
+    bad_rows = []
 
-    for chunk in pd.read_csv(path, header=None, names=cols, dtype=str, chunksize=READ_CHUNK):
-        total_seen += len(chunk)
+    def on_invalid(row):
+        bad_rows.append(row.text)
+        return "skip"
 
-        v_id = chunk["id"].str.match(r"^\d+$", na=False)
-        v_name = chunk["name"].notna() & (chunk["name"].str.strip() != "")
-        valid_mask = v_id & v_name
+    def read(types):
+        bad_rows.clear()
+        return pacsv.read_csv(
+            pa.py_buffer(data),
+            read_options=pacsv.ReadOptions(column_names=cols, use_threads=True),
+            parse_options=pacsv.ParseOptions(invalid_row_handler=on_invalid),
+            convert_options=pacsv.ConvertOptions(column_types=types, strings_can_be_null=True),
+        )
 
-        rej = chunk.loc[~valid_mask].copy()
-        log_rejected(table, rej, "id entero y name no vacío")
-        total_bad += len(rej)
+    str_types = {c: pa.string() for c in cols}
+    try:
+        tbl = read({**str_types, **{c: pa.int64() for c in INT_COLS[table]}})
+    except pa.ArrowInvalid:
+        tbl = read(str_types)
+    return tbl, list(bad_rows)
 
-        val = chunk.loc[valid_mask].copy()
-        if not val.empty:
-            val["id"] = val["id"].astype(int)
-            insert_in_sublots(table, val)
-            total_correct += len(val)
+# Ids existentes de cada dimensión referenciada, como arrays ordenados int32
+def load_fk_ids(table: str) -> dict:
+    """
+    Se consulta una sola vez por carga (después de cargar las dimensiones):
+    {columna: np.ndarray ordenado}. Tablas sin FK -> {}.
+    """
+    fks = FOREIGN_KEYS.get(table, {})
+    if not fks:
+        return {}
+    out = {}
+    with get_engine().connect() as conn:
+        for col, dim in fks.items():
+            res = conn.exec_driver_sql(f"SELECT id FROM {dim} ORDER BY id")
+            out[col] = np.fromiter((r[0] for r in res), dtype=np.int32)
+    return out
 
-        print(f"{table} | correcto={total_correct} | rechazados={total_bad} | procesadas={total_seen}")
+# Pertenencia vectorizada contra un array ordenado (búsqueda binaria)
+def _in_sorted(values: np.ndarray, ids: np.ndarray) -> np.ndarray:
+    if len(ids) == 0:
+        return np.zeros(len(values), dtype=bool)
+    pos = np.minimum(np.searchsorted(ids, values), len(ids) - 1)
+    return ids[pos] == values
 
-    print(f"RESUMEN {table} | correcto={total_correct} | rechazados={total_bad} | leídas={total_seen}")
+# Parseo y validación de un bloque (se ejecuta en el pool de procesos)
+def validate_chunk(table: str, data: bytes, fk_ids: dict = None):
+    """
+    Retorna (válidos, [(rechazados, motivo)], leídas, tiempos por etapa).
+    Función pura: no toca la base ni los logs, para poder correr en otro proceso;
+    los tiempos (telemetry.Stages) se registran en el proceso principal.
+    Los válidos salen tipados (int64 / timestamp[s]) listos para COPY.
+    Con fk_ids ({columna: ids ordenados}) también se rechazan las filas
+    huérfanas, para que una FK inválida no aborte la carga en el INSERT.
+    """
+    stages = Stages()
+    with stages.time("parse"):
+        tbl, bad_rows = parse_block(table, data)
+    seen = tbl.num_rows + len(bad_rows)
+    rejects = [(pa.table({"raw": pa.array(bad_rows, pa.string())}), "Número de columnas inválido")]
 
-# Carga CSV con encabezado
-def load_csv_with_header(table: str, path: str):
-    total_correct = total_bad = total_seen = 0
-    cols = SCHEMAS[table]
+    # Si el header está como primera fila, eliminarlo
+    if tbl.num_rows and tbl.column("id").type == pa.string() and tbl.column("id")[0].as_py() == "id":
+        tbl = tbl.slice(1)
+        seen -= 1
 
-    for chunk in pd.read_csv(path, header=0, names=cols, dtype=str, chunksize=READ_CHUNK):
-        # Si el header está como primera fila, eliminarlo
-        if len(chunk) and chunk.iloc[0].equals(pd.Series(cols, index=cols)):
-            chunk = chunk.iloc[1:].copy()
+    with stages.time("validate"):
+        val, type_rejects = validate_table(table, tbl, stages)
+    rejects.extend(type_rejects)
 
-        total_seen += len(chunk)
+    # Prefiltro de llaves foráneas
+    with stages.time("fk"):
+        for col, ids in (fk_ids or {}).items():
+            ok = _in_sorted(val[col].to_numpy(), ids)
+            if not ok.all():
+                ok = pa.array(ok)
+                rejects.append((val.filter(pc.invert(ok)), f"{col} inexistente en {FOREIGN_KEYS[table][col]}"))
+                val = val.filter(ok)
+    return val, rejects, seen, stages
 
-        # Normalizar datetime de forma flexible (T/Z/microsegundos)
-        chunk["datetime"] = normalize_datetime_series(chunk["datetime"])
+# Checkpoints: un manifiesto JSON con el avance confirmado por archivo
+def file_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
 
-        # Validaciones vectorizadas (tipos y vacíos mínimos)
-        v_id   = chunk["id"].str.match(r"^\d+$", na=False)
-        v_dep  = chunk["department_id"].str.match(r"^\d+$", na=False)
-        v_job  = chunk["job_id"].str.match(r"^\d+$", na=False)
-        v_name = chunk["name"].notna() & (chunk["name"].str.strip() != "")
-        v_dt   = chunk["datetime"].notna() & (chunk["datetime"].str.len() > 0)
+def load_manifest() -> dict:
+    if not os.path.exists(CHECKPOINT_PATH):
+        return {}
+    with open(CHECKPOINT_PATH, encoding="utf-8") as f:
+        return json.load(f)
 
-        type_mask = v_id & v_dep & v_job & v_name & v_dt
+def save_manifest(manifest: dict):
+    # Escritura atómica: un corte a mitad de escritura no corrompe el manifiesto
+    tmp = CHECKPOINT_PATH + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, CHECKPOINT_PATH)
 
-        rej_type = chunk.loc[~type_mask].copy()
-        log_rejected(table, rej_type, "Campos vacíos o tipo inválido")
-        total_bad += len(rej_type)
+def start_checkpoint(table: str, path: str, enabled: bool) -> dict:
+    """
+    Retorna la entrada del manifiesto para `path`: la guardada si el hash del
+    archivo coincide, o una nueva (archivo nuevo o modificado -> carga completa).
+    """
+    entry = {"table": table, "hash": None, "chunk": 0, "offset": 0,
+             "correct": 0, "rejected": 0, "seen": 0, "done": False}
+    if not enabled:
+        return entry
+    entry["hash"] = file_hash(path)
+    prev = load_manifest().get(os.path.abspath(path))
+    if prev and prev.get("hash") == entry["hash"] and prev.get("table") == table:
+        return prev
+    return entry
 
-        val = chunk.loc[type_mask].copy()
-        if not val.empty:
-            # Conversión de tipos finales para insertar
-            val["id"] = val["id"].astype(int)
-            val["department_id"] = val["department_id"].astype(int)
-            val["job_id"] = val["job_id"].astype(int)
+# Marca un chunk como confirmado y avanza el checkpoint si el prefijo es contiguo
+def _commit_chunk(state: dict, idx: int, end: int, seen: int, bad: int, correct: int):
+    """
+    Con varios escritores los chunks se confirman en desorden; el manifiesto
+    solo avanza hasta el primer chunk sin confirmar, así al reanudar no se
+    pierde ninguno.
+    """
+    with state["lock"]:
+        state["committed"][idx] = (end, seen, bad, correct)
+        entry = state["entry"]
+        advanced = False
+        while entry["chunk"] in state["committed"]:
+            end, seen, bad, correct = state["committed"].pop(entry["chunk"])
+            entry["chunk"] += 1
+            entry["offset"] = end
+            entry["seen"] += seen
+            entry["rejected"] += bad
+            entry["correct"] += correct
+            advanced = True
+        if advanced and state["save"]:
+            manifest = load_manifest()
+            manifest[state["key"]] = entry
+            save_manifest(manifest)
+
+# Hilo escritor: una conexión propia, consume chunks validados de la cola
+def _writer_loop(table: str, mode: str, q: queue.Queue, state: dict):
+    raw = None
+    try:
+        raw = open_writer(table, mode)
+        while True:
+            item = q.get()
+            if item is None:
+                break
+            if state["errors"]:
+                continue  # otro escritor falló: solo drenar la cola
+            idx, end, val, seen, bad = item
+            stages = Stages()
+            with stages.time("insert"):
+                write_chunk(raw, table, val, mode)
+            record_stages("loader", table, stages)
+            _commit_chunk(state, idx, end, seen, bad, len(val))
+    except Exception as e:
+        state["errors"].append(e)
+        # drenar hasta el centinela para no bloquear al lector
+        while q.get() is not None:
+            pass
+    finally:
+        if raw is not None:
+            raw.close()
+
+# Tiempo de lectura de cada bloque (etapa read)
+def _timed_blocks(table: str, blocks):
+    while True:
+        stages = Stages()
+        with stages.time("read"):
+            item = next(blocks, None)
+        if item is None:
+            return
+        record_stages("loader", table, stages)
+        yield item
+
+# Carga en pipeline: lector -> workers de validación -> escritores
+def load_table(table: str, path: str, header: bool, mode: str = DEFAULT_MODE,
+               workers: int = 1, writers: int = 1, checkpoint: bool = True):
+    """
+    Las colas acotadas (2 bloques por worker y 2 por escritor) dan
+    backpressure: la memoria depende de READ_BLOCK, no del tamaño del archivo.
+    Con checkpoint, cada chunk confirmado queda registrado en CHECKPOINT_PATH
+    y una nueva ejecución retoma desde el primer chunk pendiente.
+    """
+    entry = start_checkpoint(table, path, checkpoint)
+    if entry["done"]:
+        print(f"RESUMEN {table} | sin cambios desde la última carga (checkpoint) | "
+              f"correcto={entry['correct']} | rechazados={entry['rejected']} | leídas={entry['seen']}")
+        return
+    if entry["chunk"]:
+        print(f"{table} | reanudando desde chunk {entry['chunk']} (byte {entry['offset']})")
 
-            insert_in_sublots(table, val)
-            total_correct += len(val)
+    t0, seen0 = time.perf_counter(), entry["seen"]
+    fk_ids = load_fk_ids(table)
+    state = {"errors": [], "lock": threading.Lock(), "committed": {},
+             "entry": entry, "save": checkpoint, "key": os.path.abspath(path)}
+    write_q: queue.Queue = queue.Queue(maxsize=2 * writers)
+    threads = [
+        threading.Thread(target=_writer_loop, args=(table, mode, write_q, state), daemon=True)
+        for _ in range(writers)
+    ]
+    for t in threads:
+        t.start()
+
+    # forkserver: los workers no heredan por fork los hilos ya iniciados
+    # (escritores, reject_sink) ni las conexiones abiertas del proceso padre
+    pool = (ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("forkserver"))
+            if workers > 1 else None)
+    pending = deque()
+
+    def handle(idx, end, result):
+        val, rejects, seen, stages = result
+        bad = 0
+        with stages.time("reject_log"):
+            for rej, reason in rejects:
+                log_rejected(table, rej, reason)
+                bad += len(rej)
+        record_stages("loader", table, stages)
+        record_rows("loader", table, val.num_rows, bad)
+        if val.num_rows == 0:
+            _commit_chunk(state, idx, end, seen, bad, 0)
+        else:
+            write_q.put((idx, end, val, seen, bad))  # bloquea si los escritores van atrasados
+        print(f"{table} | correcto={entry['correct']} | rechazados={entry['rejected']} | procesadas={entry['seen']}")
+
+    blocks = iter_blocks(path, skip_header=header,
+                         start_chunk=entry["chunk"], start_offset=entry["offset"])
+    try:
+        for idx, _, end, data in _timed_blocks(table, blocks):
+            if state["errors"]:
+                break
+            if pool is None:
+                handle(idx, end, validate_chunk(table, data, fk_ids))
+                continue
+            pending.append((idx, end, pool.submit(validate_chunk, table, data, fk_ids)))
+            if len(pending) >= 2 * workers:
+                idx, end, fut = pending.popleft()
+                handle(idx, end, fut.result())
+        while pending and not state["errors"]:
+            idx, end, fut = pending.popleft()
+            handle(idx, end, fut.result())
+    finally:
+        for _, _, fut in pending:
+            fut.cancel()
+        if pool is not None:
+            pool.shutdown()
+        for _ in threads:
+            write_q.put(None)
+        for t in threads:
+            t.join()
+
+    if state["errors"]:
+        raise state["errors"][0]
+
+    entry["done"] = True
+    if checkpoint:
+        manifest = load_manifest()
+        manifest[state["key"]] = entry
+        save_manifest(manifest)
+
+    print(f"RESUMEN {table} | correcto={entry['correct']} | rechazados={entry['rejected']} | leídas={entry['seen']}")
+    # Segundos acumulados por etapa (los workers y escritores corren en paralelo)
+    secs = time.perf_counter() - t0
+    totals = " ".join(f"{k}={v:.2f}s" for k, v in sorted(stage_totals("loader", table).items()))
+    print(f"ETAPAS {table} | {totals} | {(entry['seen'] - seen0) / secs if secs else 0:.0f} filas/s")
+
+# Carga CSV sin encabezado
+def load_csv_no_header(table: str, path: str, mode: str = DEFAULT_MODE,
+                       workers: int = 1, writers: int = 1, checkpoint: bool = True):
+    load_table(table, path, header=False, mode=mode, workers=workers,
+               writers=writers, checkpoint=checkpoint)
+
+# Carga CSV con encabezado
+def load_csv_with_header(table: str, path: str, mode: str = DEFAULT_MODE,
+                         workers: int = 1, writers: int = 1, checkpoint: bool = True):
+    load_table(table, path, header=True, mode=mode, workers=workers,
+               writers=writers, checkpoint=checkpoint)
 
-        print(f"{table} | correcto={total_correct} | rechazados={total_bad} | procesadas={total_seen}")
+# Argumentos de línea de comandos
+# Archivo de entrada por defecto: data/<tabla>.csv o, si no existe, su versión comprimida
+def default_input(table: str, folder: str = "data") -> str:
+    path = os.path.join(folder, f"{table}.csv")
+    if os.path.exists(path):
+        return path
+    for ext in COMPRESSED_EXT:
+        if os.path.exists(path + ext):
+            return path + ext
+    return path
 
-    print(f"RESUMEN {table} | correcto={total_correct} | rechazados={total_bad} | leídas={total_seen}")
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Carga histórica de CSV a PostgreSQL")
+    p.add_argument(
+        "--mode", choices=MODES, default=DEFAULT_MODE,
+        help="copy: COPY a staging + merge (por defecto); batch: INSERT en lotes de 1000 (reto)",
+    )
+    p.add_argument("--workers", type=int, default=1,
+                   help="procesos de validación (1 = en el mismo proceso)")
+    p.add_argument("--writers", type=int, default=1,
+                   help="conexiones escritoras en paralelo")
+    p.add_argument("--no-checkpoint", dest="checkpoint", action="store_false",
+                   help="ignora y no actualiza el manifiesto de checkpoints")
+    for table in SCHEMAS:
+        p.add_argument(f"--{table.replace('_', '-')}", dest=table, metavar="PATH",
+                       help=f"CSV de {table}, opcionalmente comprimido (por defecto data/{table}.csv[.gz|.zst|...])")
+    p.add_argument("--telemetry-file",
+                   help="al terminar, escribe las métricas en formato Prometheus (textfile collector)")
+    args = p.parse_args(argv)
+    if args.workers < 1 or args.writers < 1:
+        p.error("--workers y --writers deben ser >= 1")
+    return args
 
 # Ejecución principal
 if __name__ == "__main__":
-    load_csv_no_header("departments", "data/departments.csv")
-    load_csv_no_header("jobs", "data/jobs.csv")
-    load_csv_with_header("hired_employees", "data/hired_employees.csv")
+    args = parse_args()
+    opts = dict(mode=args.mode, workers=args.workers, writers=args.writers,
+                checkpoint=args.checkpoint)
+    load_csv_no_header("departments", args.departments or default_input("departments"), **opts)
+    load_csv_no_header("jobs", args.jobs or default_input("jobs"), **opts)
+    load_csv_with_header("hired_employees", args.hired_employees or default_input("hired_employees"), **opts)
+    if args.telemetry_file:
+        registry.write_textfile(args.telemetry_file)
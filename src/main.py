@@ -1,11 +1,15 @@
 # src/main.py
-from typing import List, Literal, Dict, Any
-import os, json, datetime as dt
-import pandas as pd
-from fastapi import FastAPI, HTTPException, Query, Depends
-from pydantic import BaseModel, Field, validator
+from typing import List, Literal, Dict, Any, Optional
+import datetime as dt
+import pyarrow as pa
+import pyarrow.compute as pc
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Depends, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 
 # SEGURIDAD
 try:
@@ -15,26 +19,26 @@ except Exception:
     def api_key_guard():
         return True
 
+from src.parquet_utils import DEFAULT_ROW_GROUP, backup_parquet, stream_parquet
+from src.restore_engine import restore_files
+from src.validation import table_from_rows, validate_table
+from src.backup_manifest import checked_incremental_since, record_backup, restore_chain
+from src.db import dispose_async_engine, get_async_engine, get_engine, pool_stats
+from src.aggregates import AGG_TABLE
+from src.pg_bulk import create_partitions, merge_sql, missing_partitions
+from src.dim_cache import DIMENSIONS, dim_cache
+from src.rejects import query_rejects, reject_sink
+from src.response_cache import etag_matches, metrics_cache
+from src.group_commit import GroupCommitter
+from src.stream_ingest import BodyReader, iter_arrow, iter_ndjson
+from src.extracts import FORMATS, MAX_PAGE_ROWS, PAGE_ROWS, open_page
+from src.telemetry import Stages, TelemetryMiddleware, record_rows, record_stages, registry, runs_in_thread
+
 # CARGA ENV Y CONEXIÓN
 load_dotenv()
 
-def _clean_db_url(url: str | None) -> str:
-    """
-    Asegura sslmode=require y desactiva channel_binding si está en 'require',
-    lo que a veces rompe en clientes no interactivos.
-    """
-    if not url:
-        raise RuntimeError("DATABASE_URL no está definido")
-    # normalizamos sslmode
-    if "sslmode=" not in url:
-        sep = "&" if "?" in url else "?"
-        url = f"{url}{sep}sslmode=require"
-    # evitamos channel_binding=require (opcional)
-    url = url.replace("channel_binding=require", "channel_binding=disable")
-    return url
-
-DATABASE_URL = _clean_db_url(os.getenv("DATABASE_URL"))
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+# Pool compartido (src/db.py)
+engine = get_engine()
 
 # DICCIONARIO
 SCHEMAS = {
@@ -42,9 +46,34 @@ SCHEMAS = {
     "jobs": ["id", "name"],
     "hired_employees": ["id", "name", "datetime", "department_id", "job_id"],
 }
+PG_TYPES = {"id": "int", "name": "text", "datetime": "timestamp", "department_id": "int", "job_id": "int"}
+
+# Group commit de /ingest/stream (tamaño/latencia: INGEST_FLUSH_ROWS / INGEST_FLUSH_MS)
+def _on_commit(table: str, tbl: pa.Table):
+    if table in DIMENSIONS:
+        dim_cache.add(table, tbl["id"].to_pylist())
+    metrics_cache.bump()
+
+committer = GroupCommitter(engine, on_commit=_on_commit)
 
 # APP
-app = FastAPI(title="Jikkosoft Reto Técnico, Data API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Ids de departments/jobs en memoria para el FK check de /ingest.
+    # Si la base no responde al arrancar, se cargan en el primer uso.
+    try:
+        dim_cache.load(engine)
+    except Exception as e:
+        print(f"[dim_cache] carga diferida: {e}")
+    committer.start()
+    yield
+    committer.stop()  # escribe lo pendiente antes de salir
+    reject_sink.close()
+    await dispose_async_engine()
+
+app = FastAPI(title="Jikkosoft Reto Técnico, Data API", lifespan=lifespan)
+# Latencia por ruta en /telemetry y perfil por request (X-Profile, ver src/telemetry.py)
+app.add_middleware(TelemetryMiddleware)
 
 
 # SALUD / DIAGNÓSTICO
@@ -54,182 +83,363 @@ def health():
     return {"ok": True}
 
 @app.get("/__dbcheck", include_in_schema=False)
-def dbcheck():
+async def dbcheck():
     """Temporal: prueba conexión a DB desde el contenedor."""
     try:
-        with engine.connect() as c:
-            depts = c.execute(text("select count(*) from public.departments")).scalar_one()
-            jobs  = c.execute(text("select count(*) from public.jobs")).scalar_one()
-            emps  = c.execute(text("select count(*) from public.hired_employees")).scalar_one()
+        async with get_async_engine().connect() as c:
+            depts = (await c.execute(text("select count(*) from public.departments"))).scalar_one()
+            jobs  = (await c.execute(text("select count(*) from public.jobs"))).scalar_one()
+            emps  = (await c.execute(text("select count(*) from public.hired_employees"))).scalar_one()
         return {"db_url": True, "counts": {"departments": depts, "jobs": jobs, "hired_employees": emps}}
     except Exception as e:
         return {"db_url": True, "error": str(e)}
 
+@app.get("/__poolstats", include_in_schema=False, dependencies=[Depends(api_key_guard)])
+def poolstats():
+    """Espera por conexión (checkout) y edad de las conexiones de cada pool."""
+    return pool_stats()
+
+# Métricas del proceso en formato de texto de Prometheus
+@app.get("/telemetry", include_in_schema=False, dependencies=[Depends(api_key_guard)])
+def telemetry():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 
 # MODELOS / UTILIDADES
 
 class IngestRequest(BaseModel):
+    # La validación por fila la hace el motor columnar en /ingest (rechazo por fila, no 422)
     table: Literal["departments", "jobs", "hired_employees"]
     rows: List[Dict[str, Any]] = Field(..., min_items=1, max_items=1000)
 
-    @validator("rows")
-    def validate_rows(cls, v, values):
-        table = values.get("table")
-        required = SCHEMAS[table]
-        for i, r in enumerate(v, start=1):
-            miss = [c for c in required if c not in r or r[c] in (None, "", "NULL")]
-            if miss:
-                raise ValueError(f"Fila {i}: faltan campos {miss}")
-        return v
-
-def normalize_datetime(s: str) -> str:
-    # acepta ISO con T/Z/microsegundos; devuelve 'YYYY-MM-DD HH:MM:SS'
-    if not isinstance(s, str) or not s.strip():
-        raise ValueError("datetime vacío")
-    s = s.replace("T", " ").replace("Z", "").split(".")[0].strip()
-    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M"):
-        try:
-            return dt.datetime.strptime(s, fmt).strftime("%Y-%m-%d %H:%M:%S")
-        except ValueError:
-            continue
-    ts = pd.to_datetime(s, errors="coerce")
-    if pd.isna(ts):
-        raise ValueError(f"datetime inválido: {s}")
-    return ts.strftime("%Y-%m-%d %H:%M:%S")
-
-def df_from_table(table: str) -> pd.DataFrame:
-    return pd.read_sql_query(f"SELECT * FROM {table}", engine)
+# FK check (hired_employees) contra la caché de dimensiones;
+# solo los ids que no están en caché se consultan a la base
+def _fk_wanted(table: str, val: pa.Table):
+    if table != "hired_employees" or not val.num_rows:
+        return None
+    return {
+        "departments": pc.unique(val["department_id"]).to_pylist(),
+        "jobs": pc.unique(val["job_id"]).to_pylist(),
+    }
+
+def _fk_filter(table: str, val: pa.Table):
+    wanted = _fk_wanted(table, val)
+    if wanted is None:
+        return val, []
+    return _fk_split(val, dim_cache.existing(engine, wanted))
+
+async def _afk_filter(table: str, val: pa.Table):
+    wanted = _fk_wanted(table, val)
+    if wanted is None:
+        return val, []
+    return _fk_split(val, await dim_cache.aexisting(get_async_engine(), wanted))
+
+def _fk_split(val: pa.Table, existing: Dict[str, set]):
+    ok = pc.and_(
+        pc.is_in(val["department_id"], value_set=pa.array(existing["departments"], pa.int64())),
+        pc.is_in(val["job_id"], value_set=pa.array(existing["jobs"], pa.int64())),
+    )
+    if pc.all(ok).as_py():
+        return val, []
+    return val.filter(ok), [(val.filter(pc.invert(ok)), "ID inexistente (department_id o job_id)")]
+
+# Rechazados al registro estructurado (se escribe en segundo plano); retorna cuántos
+def _log_rejected(table: str, rejects, source: str) -> int:
+    n = 0
+    for rows, reason in rejects:
+        reject_sink.put(table, reason, rows, source)
+        n += rows.num_rows if isinstance(rows, pa.Table) else len(rows)
+    return n
 
 # ENDPOINTS
 
 @app.post("/ingest", dependencies=[Depends(api_key_guard)])
-def ingest(payload: IngestRequest):
+async def ingest(payload: IngestRequest):
     table = payload.table
     cols = SCHEMAS[table]
+    stages = Stages()
 
-    # Validaciones de tipos y normalización
-    valid_rows, rejected = [], []
-    for idx, row in enumerate(payload.rows, start=1):
-        try:
-            data = {c: row[c] for c in cols}
-            if table in ("departments", "jobs"):
-                data["id"] = int(data["id"])
-                if not str(data["name"]).strip():
-                    raise ValueError("name vacío")
-            else:
-                data["id"] = int(data["id"])
-                data["department_id"] = int(data["department_id"])
-                data["job_id"] = int(data["job_id"])
-                data["name"] = str(data["name"]).strip()
-                if not data["name"]:
-                    raise ValueError("name vacío")
-                data["datetime"] = normalize_datetime(data["datetime"])
-            valid_rows.append(data)
-        except Exception as e:
-            rejected.append({"row": row, "error": str(e)})
+    # Validación columnar (mismo motor que load_historico.py), motivo por fila
+    with stages.time("parse"):
+        tbl = table_from_rows(table, payload.rows)
+    with stages.time("validate"):
+        val, rejects = validate_table(table, tbl, stages)
 
     # FK check (hired_employees)
-    if table == "hired_employees" and valid_rows:
-        dept_ids = {r["department_id"] for r in valid_rows}
-        job_ids  = {r["job_id"] for r in valid_rows}
-        with engine.begin() as conn:
-            existing_depts = {r[0] for r in conn.execute(text("SELECT id FROM departments WHERE id = ANY(:ids)"), {"ids": list(dept_ids)})}
-            existing_jobs  = {r[0] for r in conn.execute(text("SELECT id FROM jobs WHERE id = ANY(:ids)"), {"ids": list(job_ids)})}
-        still_valid = []
-        for r in valid_rows:
-            if (r["department_id"] in existing_depts) and (r["job_id"] in existing_jobs):
-                still_valid.append(r)
-            else:
-                rejected.append({"row": r, "error": "ID inexistente (department_id o job_id)"})
-        valid_rows = still_valid
-
-    # Insertar válidos (≤1000)
+    with stages.time("fk"):
+        val, fk_rejects = await _afk_filter(table, val)
+
+    valid_rows = val.num_rows
+    # Se registra la fila tal como llegó, con su posición en el request
+    with stages.time("reject_log"):
+        rejected = _log_rejected(table, [
+            ([dict(payload.rows[i - 1], _row=i) for i in rej["_row"].to_pylist()], reason)
+            for rej, reason in rejects + fk_rejects
+        ], "ingest")
+
+    # Insertar válidos (≤1000): un solo statement con unnest de arrays por
+    # columna; el agregado de métricas se actualiza en la misma transacción
     if valid_rows:
-        placeholders = ", ".join([f":{c}" for c in cols])
-        collist = ", ".join(cols)
-        sql = text(f"INSERT INTO {table} ({collist}) VALUES ({placeholders}) ON CONFLICT (id) DO NOTHING")
-        with engine.begin() as conn:
-            conn.execute(sql, valid_rows)
-
-    # Log de rechazados
-    if rejected:
-        os.makedirs("logs", exist_ok=True)
-        with open("logs/rejected.log", "a", encoding="utf-8") as f:
-            for r in rejected:
-                f.write(f"{table} | {json.dumps(r, ensure_ascii=False)}\n")
-
-    return {"Insertados": len(valid_rows), "Rechazados": len(rejected)}
-
-@app.post("/backup/{table}")
-def backup_table(table: Literal["departments","jobs","hired_employees"]):
-    os.makedirs("backups", exist_ok=True)
-    df = df_from_table(table)
-    if df.empty:
-        return {"ok": True, "path": None, "note": "tabla vacía"}
-    ts = dt.datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
-    path = f"backups/{table}_{ts}.parquet"
-    df.to_parquet(path, index=False)
-    return {"ok": True, "path": path}
+        arrays = ", ".join(f"CAST(:{c} AS {PG_TYPES[c]}[])" for c in cols)
+        sql = text(merge_sql(table, cols, f"SELECT * FROM unnest({arrays})"))
+        with stages.time("insert"):
+            years = missing_partitions(table, val)
+            if years:  # en su propia transacción, antes del insert
+                async with get_async_engine().begin() as conn:
+                    await conn.run_sync(create_partitions, years)
+            async with get_async_engine().begin() as conn:
+                await conn.execute(sql, val.select(cols).to_pydict())
+        if table in DIMENSIONS:
+            dim_cache.add(table, val["id"].to_pylist())
+        metrics_cache.bump()
+
+    record_stages("ingest", table, stages)
+    record_rows("ingest", table, valid_rows, rejected)
+    return {"Insertados": valid_rows, "Rechazados": rejected}
+
+# Ingesta en streaming: NDJSON o Arrow IPC sin límite de filas
+def _ingest_stream(table: str, body, parse) -> Dict[str, Any]:
+    accepted, rejected, futures = 0, 0, []
+    stages = Stages()
+    batches = parse(body, table)
+    try:
+        while True:
+            # "parse" incluye la espera por el cuerpo del request
+            with stages.time("parse"):
+                item = next(batches, None)
+            if item is None:
+                break
+            tbl, bad = item
+            with stages.time("validate"):
+                val, rejects = validate_table(table, tbl, stages)
+            with stages.time("fk"):
+                val, fk_rejects = _fk_filter(table, val)
+            # El lote queda en la cola de group commit; se sigue leyendo
+            futures.append(committer.submit(table, val))
+            accepted += val.num_rows
+            bad_rows = [{"_row": n, "raw": raw} for n, raw in bad]
+            with stages.time("reject_log"):
+                rejected += _log_rejected(table, [(bad_rows, "JSON inválido")] + rejects + fk_rejects,
+                                          "ingest_stream")
+    except (pa.ArrowInvalid, UnicodeDecodeError, OSError) as e:  # OSError: stream Arrow cortado
+        # Los lotes ya enviados se commitean igual: el error dice cuántos
+        raise HTTPException(status_code=400, detail=_stream_outcome(futures, rejected, f"body inválido: {e}"))
+    # Se responde recién cuando todos los lotes del request están commiteados
+    with stages.time("commit_wait"):
+        errors = [fut.exception() for fut in futures]
+    failed = [e for e in errors if e is not None]
+    if failed:
+        raise HTTPException(status_code=503, detail=_stream_outcome(futures, rejected, f"error al escribir: {failed[0]}"))
+    record_stages("ingest_stream", table, stages)
+    record_rows("ingest_stream", table, accepted, rejected)
+    return {"Insertados": accepted, "Rechazados": rejected, "Lotes": len(futures)}
+
+# Detalle de un error de /ingest/stream con lo que sí quedó commiteado,
+# para que el productor sepa qué reintentar
+def _stream_outcome(futures, rejected: int, error: str) -> Dict[str, Any]:
+    committed = [fut.result() for fut in futures if fut.exception() is None]
+    return {"error": error, "Insertados": sum(committed), "Rechazados": rejected,
+            "Lotes": len(committed), "Lotes_fallidos": len(futures) - len(committed)}
+
+@app.post("/ingest/stream/{table}", dependencies=[Depends(api_key_guard)])
+@runs_in_thread
+async def ingest_stream(table: Literal["departments","jobs","hired_employees"], request: Request):
+    # application/x-ndjson (una fila JSON por línea) o
+    # application/vnd.apache.arrow.stream (record batches)
+    ctype = request.headers.get("content-type", "application/x-ndjson")
+    if "arrow" in ctype:
+        parse = iter_arrow
+    elif "json" in ctype:
+        parse = iter_ndjson
+    else:
+        raise HTTPException(status_code=415, detail=f"content-type no soportado: {ctype}")
+    return await run_in_threadpool(_ingest_stream, table, BodyReader(request.stream()), parse)
+
+# Consulta de rechazados (poda por tabla y día)
+@app.get("/rejects", dependencies=[Depends(api_key_guard)])
+def rejects(
+    table: Optional[Literal["departments","jobs","hired_employees"]] = None,
+    reason: Optional[str] = None,
+    since: Optional[dt.datetime] = None,
+    until: Optional[dt.datetime] = None,
+    limit: int = Query(100, ge=0, le=10_000),
+):
+    reject_sink.flush()  # incluir lo que aún está en memoria
+    return query_rejects(table, reason, since, until, limit)
+
+# Extracción paginada por id (keyset) en NDJSON, Arrow IPC o Parquet.
+# El cursor de la página siguiente va en X-Next-Cursor (ausente en la última).
+@app.get("/tables/{table}", dependencies=[Depends(api_key_guard)])
+def read_table(
+    table: Literal["departments","jobs","hired_employees"],
+    format: Literal["ndjson","arrow","parquet"] = "ndjson",
+    after: Optional[int] = Query(None, description="cursor: filas con id mayor"),
+    limit: int = Query(PAGE_ROWS, ge=1, le=MAX_PAGE_ROWS),
+    since: Optional[dt.datetime] = None,
+    until: Optional[dt.datetime] = None,
+    department_id: Optional[List[int]] = Query(None),
+    job_id: Optional[List[int]] = Query(None),
+    expand: bool = False,
+    compression: Literal["snappy","zstd","gzip","brotli","lz4","none"] = "snappy",
+):
+    try:
+        body, cursor = open_page(engine, table, format, limit, after, since, until,
+                                 department_id, job_id, expand, compression)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    headers = {"X-Next-Cursor": str(cursor)} if cursor is not None else {}
+    return StreamingResponse(body, media_type=FORMATS[format], headers=headers)
+
+@app.post("/backup/{table}", dependencies=[Depends(api_key_guard)])
+def backup_table(
+    table: Literal["departments","jobs","hired_employees"],
+    compression: Literal["snappy","zstd","gzip","brotli","lz4","none"] = "snappy",
+    row_group_size: int = Query(DEFAULT_ROW_GROUP, ge=1000, le=1_000_000),
+    download: bool = False,
+    incremental: bool = False,
+):
+    # Lectura con cursor del servidor y escritura por row group: memoria acotada
+    if download:
+        if incremental:
+            raise HTTPException(status_code=400, detail="incremental no aplica a download")
+        ts = dt.datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+        return StreamingResponse(
+            stream_parquet(engine, table, compression, row_group_size),
+            media_type="application/vnd.apache.parquet",
+            headers={"Content-Disposition": f'attachment; filename="{table}_{ts}.parquet"'},
+        )
+    # Incremental: solo filas con id mayor a la marca de agua del último backup
+    # (completo si la cadena ya no cuadra con la base: ver checked_incremental_since)
+    since_id = checked_incremental_since(engine, table) if incremental else None
+    path, stats = backup_parquet(engine, table, compression=compression,
+                                 row_group_size=row_group_size, since_id=since_id)
+    if path is None:
+        note = "sin filas nuevas" if since_id is not None else "tabla vacía"
+        return {"ok": True, "path": None, "note": note}
+    entry = record_backup(table, path, "parquet", stats, since_id)
+    return {"ok": True, "path": path, "filas": stats["rows"], "tipo": entry["kind"], "base": entry["base"]}
 
 @app.post("/restore/{table}")
-def restore_table(table: Literal["departments","jobs","hired_employees"], path: str):
-    if not os.path.exists(path):
-        raise HTTPException(status_code=400, detail="archivo no existe")
-    df = pd.read_parquet(path)
-    cols = SCHEMAS[table]
-    placeholders = ", ".join([f":{c}" for c in cols])
-    collist = ", ".join(cols)
-    sql = text(f"INSERT INTO {table} ({collist}) VALUES ({placeholders}) ON CONFLICT (id) DO NOTHING")
-    rows = df[cols].to_dict(orient="records")
-    with engine.begin() as conn:
-        for i in range(0, len(rows), 1000):
-            conn.execute(sql, rows[i:i+1000])
-    return {"correcto": True, "restaurados": len(rows)}
+def restore_table(
+    table: Literal["departments","jobs","hired_employees"],
+    path: List[str] = Query(None),
+    workers: int = Query(1, ge=1, le=16),
+    chain: bool = False,
+):
+    # Uno o varios archivos; en paralelo por row group con workers > 1.
+    # chain=true: completo + incrementales del manifiesto (Parquet y/o Avro),
+    # en orden; los rangos de id no se solapan, así que el paralelismo no altera el resultado.
+    try:
+        if chain:
+            path = restore_chain(table, path[0] if path else None)
+        elif not path:
+            raise HTTPException(status_code=422, detail="path es obligatorio sin chain=true")
+        stats = restore_files(engine, table, path, workers=workers)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=400, detail=f"archivo no existe: {e}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        if table in DIMENSIONS:
+            dim_cache.invalidate(table)
+        metrics_cache.bump()
+    return {"correcto": True, "restaurados": stats["leidas"], "archivos": path, **stats}
+
+# Backup de todas las tablas con un snapshot consistente
+@app.post("/backup_all", dependencies=[Depends(api_key_guard)])
+def backup_all_tables(
+    format: Literal["parquet","avro"] = "parquet",
+    compression: Literal["snappy","zstd","gzip","brotli","lz4","none"] = "snappy",
+    row_group_size: int = Query(DEFAULT_ROW_GROUP, ge=1000, le=1_000_000),
+    codec: Literal["null","deflate","snappy","zstandard"] = "deflate",
+    sync_interval: int = Query(64_000, ge=1_000, le=16_000_000),
+):
+    from src.snapshot_backup import backup_all
+    try:
+        result = backup_all(engine, format, compression=compression, row_group_size=row_group_size,
+                            codec=codec, sync_interval=sync_interval)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"correcto": True, **result}
 
 # AVRO (si usas estos utilitarios en src/avro_utils.py)
 @app.post("/backup_avro/{table}", dependencies=[Depends(api_key_guard)])
-def backup_table_avro(table: Literal["departments","jobs","hired_employees"]):
+def backup_table_avro(
+    table: Literal["departments","jobs","hired_employees"],
+    codec: Literal["null","deflate","snappy","zstandard"] = "deflate",
+    sync_interval: int = Query(64_000, ge=1_000, le=16_000_000),
+    incremental: bool = False,
+):
     from src.avro_utils import backup_avro
-    path = backup_avro(table)
-    return {"correcto": True, "path": path}
+    since_id = checked_incremental_since(engine, table) if incremental else None
+    try:
+        path, stats = backup_avro(table, codec=codec, sync_interval=sync_interval, since_id=since_id)
+    except ValueError as e:  # codec sin su librería instalada
+        raise HTTPException(status_code=400, detail=str(e))
+    if path is None:
+        return {"correcto": True, "path": None, "note": "sin filas nuevas"}
+    entry = record_backup(table, path, "avro", stats, since_id)
+    return {"correcto": True, "path": path, "filas": stats["rows"], "tipo": entry["kind"], "base": entry["base"]}
 
 @app.post("/restore_avro/{table}", dependencies=[Depends(api_key_guard)])
-def restore_table_avro(table: Literal["departments","jobs","hired_employees"], path: str):
-    from src.avro_utils import restore_avro
+def restore_table_avro(
+    table: Literal["departments","jobs","hired_employees"],
+    path: List[str] = Query(...),
+    workers: int = Query(1, ge=1, le=16),
+):
     try:
-        restored = restore_avro(table, path)
-        return {"correcto": True, "restaurados": restored}
+        stats = restore_files(engine, table, path, workers=workers)
+        return {"correcto": True, "restaurados": stats["leidas"], **stats}
     except FileNotFoundError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        if table in DIMENSIONS:
+            dim_cache.invalidate(table)
+        metrics_cache.bump()
+
+# Métricas: respuesta cacheada por (endpoint, año) con ETag; si el cliente
+# ya tiene la versión vigente (If-None-Match) se responde 304 sin ir a la base
+async def _cached_metric(request: Request, key: tuple, sql: str, params: Dict[str, Any]) -> Response:
+    entry = metrics_cache.get(key)
+    if entry is None:
+        version = metrics_cache.version
+        async with get_async_engine().connect() as conn:
+            res = await conn.execute(text(sql), params)
+            rows = [dict(r._mapping) for r in res]
+        entry = metrics_cache.put(key, rows, version)
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(entry.body, media_type="application/json", headers=headers)
 
-# Métricas
 @app.get("/metrics/hired_by_quarter", dependencies=[Depends(api_key_guard)])
-def hired_by_quarter(year: int = Query(..., ge=1900, le=2100)):
-    sql = """
+async def hired_by_quarter(request: Request, year: int = Query(..., ge=1900, le=2100)):
+    # Desde el agregado: filtra por la PK (year) en vez de recorrer hired_employees
+    sql = f"""
     SELECT d.name AS department,
            j.name AS job,
-           SUM(CASE WHEN EXTRACT(QUARTER FROM he.datetime)=1 THEN 1 ELSE 0 END) AS q1,
-           SUM(CASE WHEN EXTRACT(QUARTER FROM he.datetime)=2 THEN 1 ELSE 0 END) AS q2,
-           SUM(CASE WHEN EXTRACT(QUARTER FROM he.datetime)=3 THEN 1 ELSE 0 END) AS q3,
-           SUM(CASE WHEN EXTRACT(QUARTER FROM he.datetime)=4 THEN 1 ELSE 0 END) AS q4
-    FROM hired_employees he
-    JOIN departments d ON d.id = he.department_id
-    JOIN jobs j ON j.id = he.job_id
-    WHERE EXTRACT(YEAR FROM he.datetime) = :year
+           SUM(CASE WHEN a.quarter=1 THEN a.hires ELSE 0 END) AS q1,
+           SUM(CASE WHEN a.quarter=2 THEN a.hires ELSE 0 END) AS q2,
+           SUM(CASE WHEN a.quarter=3 THEN a.hires ELSE 0 END) AS q3,
+           SUM(CASE WHEN a.quarter=4 THEN a.hires ELSE 0 END) AS q4
+    FROM {AGG_TABLE} a
+    JOIN departments d ON d.id = a.department_id
+    JOIN jobs j ON j.id = a.job_id
+    WHERE a.year = :year
     GROUP BY d.name, j.name
     ORDER BY d.name, j.name;
     """
-    with engine.connect() as conn:
-        res = conn.execute(text(sql), {"year": year})
-        return [dict(r._mapping) for r in res]
+    return await _cached_metric(request, ("hired_by_quarter", year), sql, {"year": year})
 
 @app.get("/metrics/top_departments", dependencies=[Depends(api_key_guard)])
-def top_departments(year: int = Query(..., ge=1900, le=2100)):
-    sql = """
+async def top_departments(request: Request, year: int = Query(..., ge=1900, le=2100)):
+    sql = f"""
     WITH counts AS (
-      SELECT department_id, COUNT(*) AS hired
-      FROM hired_employees
-      WHERE EXTRACT(YEAR FROM datetime) = :year
+      SELECT department_id, SUM(hires) AS hired
+      FROM {AGG_TABLE}
+      WHERE year = :year
       GROUP BY department_id
     ),
     avg_all AS (
@@ -241,6 +451,4 @@ def top_departments(year: int = Query(..., ge=1900, le=2100)):
     WHERE c.hired > a.avg_hired
     ORDER BY c.hired DESC;
     """
-    with engine.connect() as conn:
-        res = conn.execute(text(sql), {"year": year})
-        return [dict(r._mapping) for r in res]
+    return await _cached_metric(request, ("top_departments", year), sql, {"year": year})
@@ -0,0 +1,152 @@
+import os
+from datetime import datetime
+from typing import Iterator
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from sqlalchemy import text
+from src.validation import SCHEMAS
+
+COMPRESSIONS = ("snappy", "zstd", "gzip", "brotli", "lz4", "none")
+DEFAULT_ROW_GROUP = 100_000 # Filas por row group (y por lote leído del cursor)
+
+# Tipos Arrow equivalentes a las columnas de PostgreSQL
+_ARROW_TYPES = {
+    "id": pa.int32(),
+    "name": pa.string(),
+    "datetime": pa.timestamp("us"),
+    "department_id": pa.int32(),
+    "job_id": pa.int32(),
+    # Columnas derivadas de las extracciones (/tables?expand=true)
+    "department_name": pa.string(),
+    "job_name": pa.string(),
+    "year": pa.int32(),
+    "quarter": pa.int32(),
+}
+
+# Schema Arrow de una lista de columnas
+def arrow_schema(cols, nullable: bool = False) -> pa.Schema:
+    return pa.schema([pa.field(c, _ARROW_TYPES[c], nullable=nullable) for c in cols])
+
+# Función para obtener el schema Arrow
+def _arrow_schema_for(table: str) -> pa.Schema:
+    if table not in SCHEMAS:
+        raise ValueError("Tabla no soportada")
+    return arrow_schema(SCHEMAS[table])
+
+# Sink en memoria que se vacía después de cada row group (descarga en streaming)
+class StreamSink:
+    def __init__(self):
+        self.parts = []
+        self.pos = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.parts.append(data)
+        self.pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.pos
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        out = b"".join(self.parts)
+        self.parts.clear()
+        return out
+
+# Lotes Arrow leídos con un cursor del lado del servidor
+def iter_record_batches(conn, table: str, batch_rows: int = DEFAULT_ROW_GROUP,
+                        since_id: int = None) -> Iterator[pa.RecordBatch]:
+    """
+    stream_results usa un cursor con nombre de psycopg2 y Result.yield_per fija
+    el tamaño de cada lote: la tabla nunca se materializa completa en memoria,
+    solo `batch_rows` filas a la vez.
+    Con since_id solo se leen filas con id mayor (backup incremental).
+    """
+    cols = SCHEMAS[table]
+    schema = _arrow_schema_for(table)
+    where = "" if since_id is None else "WHERE id > :since_id "
+    res = conn.execution_options(stream_results=True).execute(
+        text(f"SELECT {', '.join(cols)} FROM {table} {where}ORDER BY id"),
+        {"since_id": since_id},
+    ).yield_per(batch_rows)
+    for rows in res.partitions():
+        yield batch_from_rows(rows, schema)
+
+# Filas (tuplas en el orden del schema) a un RecordBatch
+def batch_from_rows(rows, schema: pa.Schema) -> pa.RecordBatch:
+    columns = list(zip(*rows)) or [()] * len(schema)
+    return pa.RecordBatch.from_arrays(
+        [pa.array(columns[i], type=schema.field(i).type) for i in range(len(schema))],
+        schema=schema,
+    )
+
+# Conteo y marca de agua (máximo id / datetime) de lo exportado
+def _update_stats(stats: dict, batch: pa.RecordBatch):
+    stats["rows"] += batch.num_rows
+    if batch.num_rows == 0:
+        return
+    stats["max_id"] = batch.column(0)[-1].as_py()  # lotes ordenados por id
+    if "datetime" in batch.schema.names:
+        mx = pc.max(batch.column(batch.schema.get_field_index("datetime"))).as_py()
+        if stats["max_datetime"] is None or mx > stats["max_datetime"]:
+            stats["max_datetime"] = mx
+
+def _new_stats() -> dict:
+    return {"rows": 0, "max_id": None, "max_datetime": None}
+
+# Escribe la tabla en `sink`, un row group por lote; retorna filas y marca de agua
+def write_parquet(conn, table: str, sink, compression: str = "snappy",
+                  row_group_size: int = DEFAULT_ROW_GROUP, since_id: int = None) -> dict:
+    stats = _new_stats()
+    codec = None if compression == "none" else compression
+    with pq.ParquetWriter(sink, _arrow_schema_for(table), compression=codec) as w:
+        for batch in iter_record_batches(conn, table, row_group_size, since_id):
+            w.write_batch(batch, row_group_size=row_group_size)
+            _update_stats(stats, batch)
+    return stats
+
+# Función para exportar a Parquet en backups/
+def backup_parquet(engine, table: str, out_dir="backups", compression: str = "snappy",
+                   row_group_size: int = DEFAULT_ROW_GROUP, since_id: int = None) -> tuple:
+    """Retorna (path, stats). Si no hay filas no deja archivo (path None)."""
+    os.makedirs(out_dir, exist_ok=True)
+    ts = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+    suffix = "" if since_id is None else f"_inc{since_id}"
+    path = os.path.join(out_dir, f"{table}_{ts}{suffix}.parquet")
+
+    try:
+        with engine.connect() as conn:
+            stats = write_parquet(conn, table, path, compression, row_group_size, since_id)
+    except Exception:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+
+    if stats["rows"] == 0:
+        os.remove(path)
+        return None, stats
+    return path, stats
+
+# Genera el archivo Parquet por partes para enviarlo directo al cliente
+def stream_parquet(engine, table: str, compression: str = "snappy",
+                   row_group_size: int = DEFAULT_ROW_GROUP) -> Iterator[bytes]:
+    sink = StreamSink()
+    with engine.connect() as conn:
+        codec = None if compression == "none" else compression
+        with pq.ParquetWriter(sink, _arrow_schema_for(table), compression=codec) as w:
+            for batch in iter_record_batches(conn, table, row_group_size):
+                w.write_batch(batch, row_group_size=row_group_size)
+                data = sink.drain()
+                if data:
+                    yield data
+    tail = sink.drain()  # footer
+    if tail:
+        yield tail
@@ -0,0 +1,123 @@
+import threading
+from typing import IO, List
+import pyarrow as pa
+import pyarrow.compute as pc
+from sqlalchemy import text
+
+from src.aggregates import AGG_TABLE, AGGREGATED, agg_select
+from src.validation import parse_datetime_array
+
+# Utilidades de carga masiva vía COPY: staging temporal + merge al destino
+
+# hired_employees está particionada por año con PK (id, datetime): la unicidad
+# de id la garantiza una tabla de ids sin particionar (migración 0004)
+ID_REGISTRY = {"hired_employees": "hired_employee_ids"}
+
+# Tablas particionadas por año de datetime (migración 0002)
+PARTITIONED = ("hired_employees",)
+_partition_years = set()  # años con partición ya verificada en este proceso
+_partition_lock = threading.Lock()
+
+# Años de `tbl` cuya partición todavía no se verificó en este proceso
+def missing_partitions(table: str, tbl: pa.Table) -> List[int]:
+    if table not in PARTITIONED or tbl.num_rows == 0:
+        return []
+    dts = tbl["datetime"]
+    if not pa.types.is_timestamp(dts.type):
+        dts = parse_datetime_array(dts)
+    years = set(pc.unique(pc.year(dts)).drop_null().to_pylist())
+    with _partition_lock:
+        return sorted(years - _partition_years)
+
+def create_partitions(conn, years: List[int]):
+    """
+    Crea las particiones anuales que falten (ensure_hired_partition) con una
+    conexión de SQLAlchemy. Va en una transacción propia, antes de la que
+    escribe: crear una partición bloquea hired_employees y ese lock no debe
+    durar hasta el commit del merge.
+    """
+    for y in years:
+        conn.execute(text("SELECT ensure_hired_partition(:y)"), {"y": y})
+    with _partition_lock:
+        _partition_years.update(years)
+
+# Particiones de los años de `tbl`, antes de escribirlo (motor sync)
+def ensure_partitions(engine, table: str, tbl: pa.Table):
+    years = missing_partitions(table, tbl)
+    if years:
+        with engine.begin() as conn:
+            create_partitions(conn, years)
+
+def staging_name(table: str) -> str:
+    return f"_stg_{table}"
+
+# Tabla staging de la sesión
+def ensure_staging(cur, table: str):
+    """
+    Crea la tabla staging si no existe en esta conexión.
+    Se usa TEMP (no escribe WAL, igual que UNLOGGED) para que cada conexión
+    tenga la suya y varios escritores no compitan por la misma tabla.
+    """
+    cur.execute(
+        f"CREATE TEMP TABLE IF NOT EXISTS {staging_name(table)} "
+        f"(LIKE {table} INCLUDING DEFAULTS)"
+    )
+
+def merge_sql(table: str, cols: List[str], source: str) -> str:
+    """
+    Inserta las filas de `source` (un SELECT o un VALUES) descartando ids
+    existentes y retorna una fila con la cantidad insertada.
+    - departments / jobs: ON CONFLICT (id) DO NOTHING
+    - hired_employees: primera fila por id; el id se registra en
+      hired_employee_ids con ON CONFLICT DO NOTHING y solo se insertan las
+      filas cuyo id quedó registrado. Un escritor concurrente con el mismo
+      id espera al otro en el índice de esa tabla, no en un lock global.
+    Para hired_employees, las filas insertadas suman al agregado de métricas
+    en la misma sentencia (CTE con escritura).
+    """
+    collist = ", ".join(cols)
+    if table not in ID_REGISTRY:
+        return (
+            f"WITH ins AS (INSERT INTO {table} ({collist}) {source} "
+            f"ON CONFLICT (id) DO NOTHING RETURNING 1) "
+            f"SELECT count(*) FROM ins"
+        )
+    # src ordenado por id: los escritores toman los ids en el mismo orden
+    sql = f"""
+    WITH src AS (
+      SELECT DISTINCT ON (id) {collist} FROM ({source}) AS s ({collist}) ORDER BY id
+    ), ids AS (
+      INSERT INTO {ID_REGISTRY[table]} (id)
+      SELECT id FROM src
+      ON CONFLICT DO NOTHING
+      RETURNING id
+    ), ins AS (
+      INSERT INTO {table} ({collist})
+      SELECT {", ".join(f"src.{c}" for c in cols)} FROM src JOIN ids ON ids.id = src.id
+      RETURNING datetime, department_id, job_id
+    )"""
+    if table in AGGREGATED:
+        sql += f""", agg AS (
+      INSERT INTO {AGG_TABLE} (year, quarter, department_id, job_id, hires)
+      {agg_select("ins")}
+      ON CONFLICT (year, quarter, department_id, job_id)
+      DO UPDATE SET hires = {AGG_TABLE}.hires + EXCLUDED.hires
+    )"""
+    return sql + "\n    SELECT count(*) FROM ins"
+
+# COPY del buffer CSV a staging y merge al destino
+def copy_merge(cur, table: str, cols: List[str], buf: IO) -> int:
+    """
+    Envía `buf` (CSV sin encabezado, columnas en el orden de `cols`) con
+    COPY FROM STDIN y lo mezcla en `table`. Retorna filas insertadas;
+    los duplicados se descartan igual que en el INSERT por lotes.
+    El agregado de métricas se actualiza en la misma sentencia.
+    No hace commit: la transacción la controla quien llama.
+    """
+    stg = staging_name(table)
+    collist = ", ".join(cols)
+    cur.copy_expert(f"COPY {stg} ({collist}) FROM STDIN WITH (FORMAT csv)", buf)
+    cur.execute(merge_sql(table, cols, f"SELECT {collist} FROM {stg}"))
+    inserted = cur.fetchone()[0]
+    cur.execute(f"TRUNCATE {stg}")
+    return inserted
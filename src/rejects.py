@@ -0,0 +1,165 @@
+import os
+import json
+import queue
+import atexit
+import threading
+from datetime import datetime, date, timezone
+from typing import Any, Dict, Iterator, List, Optional
+import pyarrow as pa
+
+# Registro estructurado de filas rechazadas (reemplaza logs/rejected.log):
+#   logs/rejects/table=<tabla>/date=<AAAA-MM-DD>/part-<pid>-<n>.jsonl
+# Una línea JSON por fila: {"ts", "table", "reason", "source", "line", "row"}.
+# Las escrituras se acumulan en memoria y un hilo las baja a disco en bloque.
+
+REJECTS_DIR = os.path.join("logs", "rejects")
+FLUSH_SECONDS = 1.0          # Cada cuánto se escribe lo acumulado
+FLUSH_RECORDS = 50_000       # ... o antes si se acumulan tantas filas
+MAX_PART_BYTES = 64 << 20    # Rotación: nuevo part al superar este tamaño
+
+def _partition_dir(base_dir: str, table: str, day: str) -> str:
+    return os.path.join(base_dir, f"table={table}", f"date={day}")
+
+# Marca de tiempo UTC en el mismo formato que los registros
+def _utc(ts: datetime) -> datetime:
+    return ts.astimezone(timezone.utc).replace(tzinfo=None) if ts.tzinfo else ts
+
+class RejectSink:
+    def __init__(self, base_dir: str = REJECTS_DIR, flush_seconds: float = FLUSH_SECONDS,
+                 flush_records: int = FLUSH_RECORDS, max_part_bytes: int = MAX_PART_BYTES):
+        self.base_dir = base_dir
+        self.flush_seconds = flush_seconds
+        self.flush_records = flush_records
+        self.max_part_bytes = max_part_bytes
+        self._q: "queue.Queue" = queue.Queue()
+        self._pending = 0
+        self._parts: Dict[tuple, int] = {}  # (tabla, día) -> número de part actual
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._wake = threading.Event()
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="reject-sink", daemon=True)
+                    self._thread.start()
+                    atexit.register(self.close)
+
+    # Encola rechazos: tabla Arrow o lista de dicts; `_row` pasa a ser "line"
+    def put(self, table: str, reason: str, rows, source: str):
+        n = rows.num_rows if isinstance(rows, pa.Table) else len(rows)
+        if n == 0:
+            return
+        self._ensure_thread()
+        ts = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
+        self._q.put((ts, table, reason, source, rows))
+        self._pending += n
+        if self._pending >= self.flush_records:
+            self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            try:
+                self._drain()
+            except Exception as e:  # el hilo no debe morir por un error de disco
+                print(f"[rejects] error al escribir: {e}")
+
+    # Baja a disco todo lo encolado, agrupado por partición
+    def _drain(self):
+        with self._io_lock:
+            batches: Dict[tuple, List[str]] = {}
+            while True:
+                try:
+                    ts, table, reason, source, rows = self._q.get_nowait()
+                except queue.Empty:
+                    break
+                lines = batches.setdefault((table, ts[:10]), [])
+                for r in (rows.to_pylist() if isinstance(rows, pa.Table) else rows):
+                    r = dict(r)
+                    rec = {"ts": ts, "table": table, "reason": reason, "source": source,
+                           "line": r.pop("_row", None), "row": r}
+                    lines.append(json.dumps(rec, ensure_ascii=False, default=str))
+            self._pending = 0
+            for (table, day), lines in batches.items():
+                self._append(table, day, lines)
+
+    def _append(self, table: str, day: str, lines: List[str]):
+        folder = _partition_dir(self.base_dir, table, day)
+        os.makedirs(folder, exist_ok=True)
+        key = (table, day)
+        n = self._parts.get(key, 0)
+        path = os.path.join(folder, f"part-{os.getpid()}-{n:04d}.jsonl")
+        while os.path.exists(path) and os.path.getsize(path) >= self.max_part_bytes:
+            n += 1
+            path = os.path.join(folder, f"part-{os.getpid()}-{n:04d}.jsonl")
+        self._parts[key] = n
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+    # Escritura inmediata (antes de consultar o al terminar un script)
+    def flush(self):
+        self._drain()
+
+    def close(self):
+        self._drain()
+
+reject_sink = RejectSink()
+
+# Consulta con poda de particiones: solo se leen las carpetas de las tablas
+# y días dentro del rango pedido
+def _partitions(base_dir: str, table: Optional[str], since: Optional[datetime],
+                until: Optional[datetime]) -> Iterator[str]:
+    if not os.path.isdir(base_dir):
+        return
+    first = since.date() if since else date.min
+    last = until.date() if until else date.max
+    for tdir in sorted(os.listdir(base_dir)):
+        if not tdir.startswith("table=") or (table and tdir != f"table={table}"):
+            continue
+        for ddir in sorted(os.listdir(os.path.join(base_dir, tdir))):
+            if not ddir.startswith("date="):
+                continue
+            try:
+                day = date.fromisoformat(ddir[5:])
+            except ValueError:
+                continue
+            if first <= day <= last:
+                folder = os.path.join(base_dir, tdir, ddir)
+                for part in sorted(os.listdir(folder)):
+                    if part.endswith(".jsonl"):
+                        yield os.path.join(folder, part)
+
+def query_rejects(table: Optional[str] = None, reason: Optional[str] = None,
+                  since: Optional[datetime] = None, until: Optional[datetime] = None,
+                  limit: int = 100, base_dir: str = REJECTS_DIR) -> Dict[str, Any]:
+    """
+    Cuenta rechazos por (tabla, motivo) y devuelve hasta `limit` filas.
+    `reason` filtra por coincidencia parcial; since/until por marca de tiempo.
+    """
+    since = _utc(since) if since else None
+    until = _utc(until) if until else None
+    lo = since.strftime("%Y-%m-%dT%H:%M:%SZ") if since else None
+    hi = until.strftime("%Y-%m-%dT%H:%M:%SZ") if until else None
+    counts: Dict[tuple, int] = {}
+    rows: List[Dict] = []
+    for path in _partitions(base_dir, table, since, until):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if reason and reason not in line:
+                    continue
+                rec = json.loads(line)
+                if (lo and rec["ts"] < lo) or (hi and rec["ts"] > hi):
+                    continue
+                if reason and reason not in rec["reason"]:
+                    continue
+                key = (rec["table"], rec["reason"])
+                counts[key] = counts.get(key, 0) + 1
+                if len(rows) < limit:
+                    rows.append(rec)
+    by_reason = [{"table": t, "reason": r, "count": c}
+                 for (t, r), c in sorted(counts.items(), key=lambda kv: -kv[1])]
+    return {"total": sum(counts.values()), "por_motivo": by_reason, "filas": rows}
@@ -0,0 +1,71 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+# Caché de respuestas de /metrics/* por endpoint y año (LRU + TTL).
+# Una entrada vale mientras no cambie la versión de datos del proceso, que
+# suben /ingest, /ingest/stream y las restauraciones. Las escrituras de otros
+# procesos (load_historico.py, otros workers de uvicorn) no la suben: para
+# esas el TTL acota cuánto puede quedar desactualizada una respuesta.
+
+CACHE_TTL = float(os.getenv("METRICS_CACHE_TTL", "60"))   # segundos
+CACHE_SIZE = int(os.getenv("METRICS_CACHE_SIZE", "256"))  # entradas
+
+class CachedResponse:
+    __slots__ = ("version", "created", "body", "etag")
+
+    def __init__(self, version: int, body: bytes):
+        self.version = version
+        self.created = time.monotonic()
+        self.body = body
+        # ETag según el contenido: si al recalcular sale lo mismo, sigue valiendo
+        self.etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+
+class ResponseCache:
+    def __init__(self, max_entries: int = CACHE_SIZE, ttl: float = CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version = 0
+        self._entries: "OrderedDict[tuple, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    # Los datos cambiaron: todas las entradas quedan viejas
+    def bump(self):
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+
+    def get(self, key: tuple) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.version != self.version or time.monotonic() - entry.created > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    # Guarda el JSON ya serializado; `version` es la vigente al empezar la consulta
+    def put(self, key: tuple, payload: Any, version: int) -> CachedResponse:
+        entry = CachedResponse(version, json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8"))
+        with self._lock:
+            if version == self.version:  # no guardar resultados leídos antes de un bump
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return entry
+
+metrics_cache = ResponseCache()
+
+# If-None-Match puede traer varias etiquetas o "*"
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
@@ -0,0 +1,62 @@
+import os
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+from sqlalchemy import text
+
+from src.parquet_utils import DEFAULT_ROW_GROUP, write_parquet
+from src.avro_utils import DEFAULT_CODEC, DEFAULT_SYNC_INTERVAL, SCHEMAS, write_avro
+from src.backup_manifest import record_backup
+
+# Backup de todas las tablas sobre un mismo snapshot exportado de PostgreSQL
+
+def _dump_table(engine, table: str, snapshot: str, fmt: str, path: str, opts: Dict) -> Dict:
+    """
+    Cada worker abre su conexión, inicia una transacción REPEATABLE READ y
+    adopta el snapshot del coordinador: todas las tablas ven el mismo estado.
+    """
+    with engine.connect().execution_options(isolation_level="REPEATABLE READ") as conn:
+        # Debe ser la primera sentencia de la transacción
+        conn.execute(text(f"SET TRANSACTION SNAPSHOT '{snapshot}'"))
+        if fmt == "parquet":
+            return write_parquet(conn, table, path, opts["compression"], opts["row_group_size"])
+        with open(path, "wb") as out:
+            return write_avro(conn, table, out, opts["codec"], opts["sync_interval"])
+
+def backup_all(engine, fmt: str = "parquet", out_dir: str = "backups",
+               compression: str = "snappy", row_group_size: int = DEFAULT_ROW_GROUP,
+               codec: str = DEFAULT_CODEC, sync_interval: int = DEFAULT_SYNC_INTERVAL) -> Dict:
+    """
+    El coordinador mantiene abierta su transacción (y con ella el snapshot)
+    hasta que terminan los workers; departments, jobs y hired_employees se
+    exportan en paralelo, cada una en su conexión.
+    Requiere conexión directa: un pooler en modo transacción no soporta
+    pg_export_snapshot.
+    """
+    if fmt not in ("parquet", "avro"):
+        raise ValueError(f"formato no soportado: {fmt}")
+    os.makedirs(out_dir, exist_ok=True)
+    ts = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+    opts = {"compression": compression, "row_group_size": row_group_size,
+            "codec": codec, "sync_interval": sync_interval}
+    paths = {t: os.path.join(out_dir, f"{t}_{ts}_snap.{fmt}") for t in SCHEMAS}
+
+    with engine.connect().execution_options(isolation_level="REPEATABLE READ") as coord:
+        snapshot = coord.execute(text("SELECT pg_export_snapshot()")).scalar_one()
+        try:
+            with ThreadPoolExecutor(max_workers=len(SCHEMAS)) as ex:
+                futures = {t: ex.submit(_dump_table, engine, t, snapshot, fmt, paths[t], opts)
+                           for t in SCHEMAS}
+                stats = {t: f.result() for t, f in futures.items()}
+        except Exception:
+            for p in paths.values():
+                if os.path.exists(p):
+                    os.remove(p)
+            raise
+        coord.rollback()
+
+    tables = {}
+    for t, st in stats.items():
+        record_backup(t, paths[t], fmt, st, None)
+        tables[t] = {"path": paths[t], "filas": st["rows"]}
+    return {"snapshot": snapshot, "formato": fmt, "tablas": tables}
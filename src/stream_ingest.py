@@ -0,0 +1,92 @@
+import io
+import json
+from typing import Iterator, List, Tuple
+import anyio
+import pyarrow as pa
+
+from src.validation import SCHEMAS, table_from_rows
+
+# Lectura incremental del body de /ingest/stream: NDJSON o Arrow IPC (stream)
+
+CHUNK_ROWS = 5000 # Filas por lote de validación
+
+# Archivo de solo lectura sobre el body del request (async) para usar desde un
+# hilo del threadpool: cada read pide el siguiente fragmento al event loop
+class BodyReader(io.RawIOBase):
+    def __init__(self, body):
+        self._body = body.__aiter__()
+        self._buf = b""
+        self._eof = False
+
+    def readable(self):
+        return True
+
+    async def _next(self):
+        try:
+            return await self._body.__anext__()
+        except StopAsyncIteration:
+            return None
+
+    def readinto(self, b) -> int:
+        while not self._buf and not self._eof:
+            chunk = anyio.from_thread.run(self._next)
+            if chunk is None:
+                self._eof = True
+            else:
+                self._buf = chunk
+        n = min(len(b), len(self._buf))
+        b[:n] = self._buf[:n]
+        self._buf = self._buf[n:]
+        return n
+
+# NDJSON: lotes de texto (columnas del esquema + `_row` = número de línea)
+# y las líneas que no son un objeto JSON
+def iter_ndjson(f, table: str, chunk_rows: int = CHUNK_ROWS) -> Iterator[Tuple[pa.Table, List[Tuple[int, str]]]]:
+    rows, bad = [], []
+    lineno = 0
+    for line in io.BufferedReader(f, buffer_size=1 << 20):
+        lineno += 1
+        text = line.strip()
+        if not text:
+            continue
+        try:
+            obj = json.loads(text)
+            if not isinstance(obj, dict):
+                raise ValueError
+        except ValueError:
+            bad.append((lineno, text.decode("utf-8", "replace")))
+            continue
+        rows.append((lineno, obj))
+        if len(rows) >= chunk_rows:
+            yield _ndjson_table(table, rows), bad
+            rows, bad = [], []
+    if rows or bad:
+        yield _ndjson_table(table, rows), bad
+
+def _ndjson_table(table: str, rows: List[Tuple[int, dict]]) -> pa.Table:
+    tbl = table_from_rows(table, [r for _, r in rows])
+    return tbl.set_column(tbl.column_names.index("_row"), "_row",
+                          pa.array([n for n, _ in rows], pa.int32()))
+
+# Arrow IPC: cada record batch es un lote; columnas faltantes quedan en null.
+# Un datetime tipado (timestamp/date) llega tal cual al validador, sin texto
+def iter_arrow(f, table: str) -> Iterator[Tuple[pa.Table, List[Tuple[int, str]]]]:
+    offset = 0
+    with pa.ipc.open_stream(pa.PythonFile(f, mode="r")) as reader:
+        for batch in reader:
+            data = {}
+            for c in SCHEMAS[table]:
+                if c in batch.schema.names:
+                    col = batch.column(c)
+                    if c == "datetime":
+                        keep = pa.types.is_timestamp(col.type) or pa.types.is_date(col.type)
+                    else:
+                        keep = pa.types.is_integer(col.type)
+                    if not (keep or pa.types.is_string(col.type)):
+                        col = col.cast(pa.string())
+                    data[c] = col
+                else:
+                    data[c] = pa.nulls(batch.num_rows, pa.string())
+            data["_row"] = pa.array(range(offset + 1, offset + batch.num_rows + 1), pa.int32())
+            offset += batch.num_rows
+            yield pa.table(data), []
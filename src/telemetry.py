@@ -0,0 +1,301 @@
+import os
+import re
+import time
+import inspect
+import cProfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Instrumentación en proceso con salida en formato de texto de Prometheus
+# (GET /telemetry en la API; archivo para el textfile collector en los scripts).
+# Sin dependencias: contadores e histogramas con etiquetas, protegidos con un
+# lock, y colectores que calculan valores al momento de exportar.
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _num(v: float) -> str:
+    return repr(float(v)) if v != int(v) else str(int(v))
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name, self.help, self.label_names = name, help, labels
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, value: float = 1, *labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + value
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, v in items:
+            yield f"{self.name}{_labels(self.label_names, labels)} {_num(v)}"
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name, self.help, self.label_names = name, help, labels
+        self.buckets = buckets
+        self._values: Dict[Tuple, list] = {}  # etiquetas -> [conteo por bucket..., suma, total]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        with self._lock:
+            row = self._values.get(labels)
+            if row is None:
+                row = self._values[labels] = [0] * (len(self.buckets) + 2)
+            for i, le in enumerate(self.buckets):
+                if value <= le:
+                    row[i] += 1
+                    break
+            row[-2] += value
+            row[-1] += 1
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        for labels, row in items:
+            acc = 0
+            for le, n in zip(self.buckets, row):
+                acc += n
+                bucket = _labels(self.label_names, labels, f'le="{le}"')
+                yield f"{self.name}_bucket{bucket} {acc}"
+            bucket = _labels(self.label_names, labels, 'le="+Inf"')
+            yield f"{self.name}_bucket{bucket} {row[-1]}"
+            yield f"{self.name}_sum{_labels(self.label_names, labels)} {_num(row[-2])}"
+            yield f"{self.name}_count{_labels(self.label_names, labels)} {row[-1]}"
+
+class Registry:
+    def __init__(self):
+        self._metrics: List = []
+        self._collectors: List[Callable] = []
+
+    def counter(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> Counter:
+        m = Counter(name, help, labels)
+        self._metrics.append(m)
+        return m
+
+    def histogram(self, name: str, help: str, labels: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        m = Histogram(name, help, labels, buckets)
+        self._metrics.append(m)
+        return m
+
+    # fn() -> [(nombre, tipo, ayuda, etiquetas (tupla de nombres), [(valores, número)])]
+    def collector(self, fn: Callable):
+        self._collectors.append(fn)
+
+    def render(self) -> str:
+        lines = []
+        for m in self._metrics:
+            lines += [f"# HELP {m.name} {m.help}", f"# TYPE {m.name} {m.kind}"]
+            lines += m.samples()
+        for fn in self._collectors:
+            try:
+                families = fn()
+            except Exception as e:  # un colector roto no debe tumbar la exportación
+                lines.append(f"# colector {getattr(fn, '__name__', fn)}: {e}")
+                continue
+            for name, kind, help, names, samples in families:
+                lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+                lines += [f"{name}{_labels(names, values)} {_num(v)}" for values, v in samples]
+        return "\n".join(lines) + "\n"
+
+    # Archivo para el textfile collector de node_exporter (escritura atómica)
+    def write_textfile(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp, path)
+
+registry = Registry()
+
+STAGE_SECONDS = registry.histogram(
+    "pipeline_stage_seconds", "Tiempo por etapa de cada lote (datetime es parte de validate)",
+    ("pipeline", "table", "stage"))
+ROWS = registry.counter(
+    "pipeline_rows_total", "Filas procesadas por resultado", ("pipeline", "table", "outcome"))
+HTTP_SECONDS = registry.histogram(
+    "http_request_duration_seconds", "Duración de cada request, cuerpo incluido",
+    ("method", "route", "status"))
+POOL_WAIT_SECONDS = registry.histogram(
+    "db_pool_checkout_wait_seconds", "Espera por una conexión del pool", ("pool",),
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30))
+POOL_TIMEOUTS = registry.counter(
+    "db_pool_checkout_timeouts_total", "Checkouts que agotaron DB_POOL_TIMEOUT", ("pool",))
+
+# Tiempos por etapa de un lote. Es un dict simple para poder volver desde
+# los workers de validación (otro proceso) y registrarse en el principal.
+class Stages:
+    def __init__(self):
+        self.seconds: Dict[str, float] = {}
+
+    @contextmanager
+    def time(self, stage: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[stage] = self.seconds.get(stage, 0.0) + time.perf_counter() - t0
+
+def record_stages(pipeline: str, table: str, stages: Stages):
+    for stage, secs in stages.seconds.items():
+        STAGE_SECONDS.observe(secs, pipeline, table, stage)
+
+def record_rows(pipeline: str, table: str, valid: int, rejected: int):
+    if valid:
+        ROWS.inc(valid, pipeline, table, "valid")
+    if rejected:
+        ROWS.inc(rejected, pipeline, table, "rejected")
+
+# Resumen legible de una etapa acumulada (para los print de los scripts)
+def stage_totals(pipeline: str, table: str) -> Dict[str, float]:
+    out = {}
+    with STAGE_SECONDS._lock:
+        for (p, t, stage), row in STAGE_SECONDS._values.items():
+            if p == pipeline and t == table:
+                out[stage] = row[-2]
+    return out
+
+# Perfil por request: encabezado X-Profile con PROFILE_REQUESTS=1.
+# pyinstrument (si está instalado) sigue las corrutinas; cProfile solo ve el
+# hilo del event loop, incluidos otros requests que se intercalen. Ambos
+# perfilan solo ese hilo: las rutas sync (o que delegan en el threadpool) no
+# se perfilan, y hay un solo perfil activo a la vez (dos cProfile activos
+# chocan; en 3.12+ el segundo enable() falla).
+PROFILE_ENABLED = os.getenv("PROFILE_REQUESTS", "0") == "1"
+PROFILE_HEADER = b"x-profile"
+PROFILE_DIR = os.path.join("logs", "profiles")
+_profile_lock = threading.Lock()
+
+# Marca un endpoint async cuyo trabajo corre en el threadpool (su perfil saldría vacío)
+def runs_in_thread(fn):
+    fn.runs_in_thread = True
+    return fn
+
+class _RequestProfiler:
+    def __init__(self, kind: str):
+        self.kind = kind
+        if kind == "pyinstrument":
+            from pyinstrument import Profiler
+            self._p = Profiler(async_mode="enabled")
+            self._p.start()
+        else:
+            self._p = cProfile.Profile()
+            self._p.enable()
+
+    def _dump(self, label: str) -> str:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        name = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{re.sub(r'[^A-Za-z0-9]+', '_', label).strip('_')}"
+        if self.kind == "pyinstrument":
+            self._p.stop()
+            path = os.path.join(PROFILE_DIR, name + ".html")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(self._p.output_html())
+        else:
+            self._p.disable()
+            path = os.path.join(PROFILE_DIR, name + ".prof")
+            self._p.dump_stats(path)
+        return path
+
+    def stop(self, label: str) -> str:
+        try:
+            return self._dump(label)
+        finally:
+            _profile_lock.release()
+
+def _profiler_for(value: str) -> Optional[_RequestProfiler]:
+    if not _profile_lock.acquire(blocking=False):
+        return None
+    try:
+        if value == "cprofile":
+            return _RequestProfiler("cprofile")
+        try:
+            return _RequestProfiler("pyinstrument")
+        except ImportError:
+            return _RequestProfiler("cprofile")
+    except BaseException:
+        _profile_lock.release()
+        raise
+
+# Endpoint que atenderá el request; None si no hay ruta
+def _endpoint_for(scope):
+    from starlette.routing import Match
+    app = scope.get("app")
+    for route in getattr(app, "routes", ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "endpoint", None)
+    return None
+
+def _runs_on_loop(endpoint) -> bool:
+    if endpoint is None:
+        return True
+    return inspect.iscoroutinefunction(endpoint) and not getattr(endpoint, "runs_in_thread", False)
+
+def _authorized(headers: Dict[bytes, bytes]) -> bool:
+    expected = os.getenv("API_KEY")
+    return not expected or headers.get(b"x-api-key", b"").decode("latin-1") == expected
+
+# Middleware ASGI: histograma de latencia por ruta y perfil opcional
+class TelemetryMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        profiler = skipped = None
+        if PROFILE_ENABLED:
+            headers = dict(scope.get("headers") or [])
+            value = headers.get(PROFILE_HEADER, b"").decode("latin-1").lower()
+            if value and value not in ("0", "false") and _authorized(headers):
+                if not _runs_on_loop(_endpoint_for(scope)):
+                    skipped = b"sync"
+                else:
+                    profiler = _profiler_for(value)
+                    skipped = None if profiler is not None else b"busy"
+        status = 500
+        t0 = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status, profiler
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if skipped is not None:
+                    message = {**message, "headers": list(message.get("headers", []))
+                               + [(b"x-profile-skipped", skipped)]}
+                if profiler is not None:
+                    # El perfil cubre hasta los encabezados (en un streaming, no el cuerpo)
+                    path = profiler.stop(f"{scope['method']} {scope['path']}")
+                    profiler = None
+                    message = {**message, "headers": list(message.get("headers", []))
+                               + [(b"x-profile-path", path.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if profiler is not None:
+                profiler.stop(f"{scope['method']} {scope['path']}")
+            route = scope.get("route")
+            # Plantilla de la ruta (/tables/{table}), no la URL: cardinalidad acotada
+            HTTP_SECONDS.observe(time.perf_counter() - t0, scope["method"],
+                                 getattr(route, "path", "<sin ruta>"), status)
@@ -0,0 +1,258 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Motor de validación columnar compartido por load_historico.py y POST /ingest
+
+# Diccionario de datos
+SCHEMAS = {
+    "departments": ["id", "name"],
+    "jobs": ["id", "name"],
+    "hired_employees": ["id", "name", "datetime", "department_id", "job_id"],
+}
+
+# Columnas enteras por tabla (el resto se lee como texto)
+INT_COLS = {
+    "departments": ["id"],
+    "jobs": ["id"],
+    "hired_employees": ["id", "department_id", "job_id"],
+}
+INT32_MAX = 2**31 - 1 # Columnas INTEGER en PostgreSQL
+
+# Valores que se consideran vacíos al armar columnas desde JSON
+NULL_TOKENS = ("", "NULL")
+
+# Motor de fechas: detecta la variante ISO-8601 dominante (T o espacio,
+# decimales, Z) y parsea cada bloque con ese formato exacto directo sobre
+# los bytes del array (numpy, sin regex ni strings intermedios). Solo los
+# valores que no calzan pasan a las otras variantes y, al final, a pandas.
+DT_ISO_RE = re.compile(r"^\d{4}-\d{2}-\d{2}(?:([T ])\d{2}:\d{2}:\d{2}(?:\.(\d{1,9}))?(Z)?)?$")
+DT_SAMPLE = 1000   # Valores usados para detectar la variante
+_HAS_DIGIT = re.compile(r"\d")
+_dt_format = None  # Variante dominante del último bloque en este proceso
+
+# Variante de un texto: (separador, decimales, Z); separador "" = solo fecha
+def _dt_key(m) -> Tuple[str, int, bool]:
+    return (m.group(1) or "", len(m.group(2) or ""), m.group(3) is not None)
+
+def _dt_width(fmt: Tuple[str, int, bool]) -> int:
+    sep, frac, zulu = fmt
+    return 10 if not sep else 19 + (frac + 1 if frac else 0) + int(zulu)
+
+def detect_datetime_format(values: List[Optional[str]]) -> Optional[Tuple[str, int, bool]]:
+    """Variante ISO más frecuente en una muestra, o None si ninguno es ISO."""
+    counts: Dict[Tuple, int] = {}
+    for v in values:
+        m = DT_ISO_RE.match(v) if v else None
+        if m:
+            key = _dt_key(m)
+            counts[key] = counts.get(key, 0) + 1
+    return max(counts, key=counts.get) if counts else None
+
+# Bytes de un array de texto sin nulos con todos sus valores de `width` bytes
+def _fixed_width(arr: pa.Array, width: int) -> np.ndarray:
+    kind = np.dtype(np.int64 if pa.types.is_large_string(arr.type) else np.int32)
+    offsets = np.frombuffer(arr.buffers()[1], kind, len(arr) + 1, arr.offset * kind.itemsize)
+    data = np.frombuffer(arr.buffers()[2], np.uint8)
+    return data[offsets[0]:offsets[-1]].reshape(-1, width)
+
+def _number(d: np.ndarray, lo: int, hi: int) -> np.ndarray:
+    out = d[lo].astype(np.int32)
+    for i in range(lo + 1, hi):
+        out *= 10
+        out += d[i]
+    return out
+
+# Tablas del calendario (años 0..9999): día de inicio de cada año desde
+# 1970-01-01, si es bisiesto, y día de inicio / largo de cada mes
+_YEAR_START = (np.arange(10001) - 1970).astype("datetime64[Y]").astype("datetime64[D]").astype(np.int64)
+_LEAP = (np.diff(_YEAR_START) == 366).astype(np.int32)
+_MONTH_DAYS = np.array([[31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31],
+                        [31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]], np.int32)
+_MONTH_START = np.concatenate([np.zeros((2, 1), np.int32), np.cumsum(_MONTH_DAYS, axis=1)[:, :-1]], axis=1)
+
+def _parse_format(arr: pa.Array, fmt: Tuple[str, int, bool]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Segundos desde epoch y máscara de válidos con el formato exacto `fmt`.
+    Estricto: dígitos y separadores en su lugar, mes/día según el calendario,
+    horas < 24, minutos y segundos < 60. Los decimales se truncan y la Z se
+    descarta (la hora ya es UTC).
+    """
+    sep, frac, zulu = fmt
+    # Fila i = carácter i de todos los valores (lecturas contiguas)
+    chars = np.ascontiguousarray(_fixed_width(arr, _dt_width(fmt)).T)
+    digits = [0, 1, 2, 3, 5, 6, 8, 9]
+    seps = {4: "-", 7: "-"}
+    if sep:
+        digits += [11, 12, 14, 15, 17, 18] + list(range(20, 20 + frac))
+        seps.update({10: sep, 13: ":", 16: ":"})
+        if frac:
+            seps[19] = "."
+        if zulu:
+            seps[len(chars) - 1] = "Z"
+    # uint8: lo que está por debajo de "0" da la vuelta y queda >= 10
+    d = chars - np.uint8(48)
+    ok = np.all(d[digits] < 10, axis=0)
+    for i, ch in seps.items():
+        ok &= chars[i] == ord(ch)
+
+    year, month, day = _number(d, 0, 4), _number(d, 5, 7), _number(d, 8, 10)
+    year = np.where(ok, year, 1970)  # años con caracteres no numéricos saldrían de las tablas
+    month_ok = (month >= 1) & (month <= 12)
+    cell = _LEAP[year] * 12 + np.where(month_ok, month, 1) - 1
+    ok &= (year >= 1) & month_ok & (day >= 1) & (day <= _MONTH_DAYS.ravel()[cell])
+    secs = (_YEAR_START[year] + _MONTH_START.ravel()[cell] + day - 1) * 86400
+    if sep:
+        hour, minute, second = _number(d, 11, 13), _number(d, 14, 16), _number(d, 17, 19)
+        ok &= (hour < 24) & (minute < 60) & (second < 60)
+        secs += hour * 3600 + minute * 60 + second
+    return secs, ok
+
+def _parse_chunk(arr: pa.Array) -> pa.Array:
+    global _dt_format
+    n = len(arr)
+    secs = np.zeros(n, np.int64)
+    done = np.zeros(n, dtype=bool)
+    lengths = pc.fill_null(pc.binary_length(arr), -1).to_numpy(zero_copy_only=False)
+    hits: Dict[Tuple, int] = {}
+    fmt = _dt_format or detect_datetime_format(arr.slice(0, DT_SAMPLE).to_pylist())
+    while fmt is not None and fmt not in hits:
+        idx = np.flatnonzero(~done & (lengths == _dt_width(fmt)))
+        if len(idx) == n:  # todo el bloque con el mismo ancho: sin copias
+            secs, done = _parse_format(arr, fmt)
+        elif len(idx):
+            s, ok = _parse_format(arr.take(pa.array(idx)), fmt)
+            secs[idx[ok]] = s[ok]
+            done[idx[ok]] = True
+        hits[fmt] = int(done[idx].sum())
+        # Siguiente variante entre los que faltan (p. ej. un 10% con milisegundos)
+        rest = np.flatnonzero(~done & (lengths >= 0))[:DT_SAMPLE]
+        if not len(rest):
+            break
+        fmt = detect_datetime_format(arr.take(pa.array(rest)).to_pylist())
+    if hits:
+        _dt_format = max(hits, key=hits.get)
+
+    # Fallback uno a uno: otros formatos que pandas reconoce (si trae zona
+    # horaria se descarta). Un ISO de una variante ya probada es inválido,
+    # igual que un texto sin dígitos; los valores repetidos se parsean una vez.
+    seen: Dict[str, Optional[int]] = {}
+    for i in np.flatnonzero(~done & (lengths >= 0)):
+        v = arr[i].as_py()
+        if v not in seen:
+            m = DT_ISO_RE.match(v)
+            ts = None
+            if not (m and _dt_key(m) in hits) and _HAS_DIGIT.search(v):
+                ts = pd.to_datetime(v, errors="coerce")
+            if ts is None or pd.isna(ts):
+                seen[v] = None
+            else:
+                if ts.tzinfo is not None:
+                    ts = ts.tz_localize(None)
+                seen[v] = int(ts.to_datetime64().astype("datetime64[s]").astype(np.int64))
+        if seen[v] is not None:
+            secs[i] = seen[v]
+            done[i] = True
+    return pa.array(secs, pa.timestamp("s"), mask=~done)
+
+# Columnas que ya llegan como fecha (Arrow IPC): sin pasar por texto
+def _from_temporal(arr: pa.Array) -> pa.Array:
+    if pa.types.is_timestamp(arr.type) and arr.type.tz is not None:
+        arr = pc.local_timestamp(arr)  # hora local, como al descartar la zona de un texto
+    if pa.types.is_timestamp(arr.type):
+        return pc.cast(pc.floor_temporal(arr, unit="second"), pa.timestamp("s"))
+    return pc.cast(arr, pa.timestamp("s"))
+
+def parse_datetime_array(arr) -> pa.ChunkedArray:
+    """
+    Normaliza datetimes ISO (texto) o columnas de fecha a timestamp[s]:
+    - camino rápido: formato exacto de la variante dominante, vectorizado
+    - otras variantes ISO del mismo bloque se parsean igual, por grupo
+    - el resto se intenta con pandas uno a uno
+    - inválidos (incluido un día que no existe, p. ej. 30 de febrero) -> null -> se rechazan
+    """
+    if pa.types.is_timestamp(arr.type) or pa.types.is_date(arr.type):
+        chunks = arr.chunks if isinstance(arr, pa.ChunkedArray) else [arr]
+        return pa.chunked_array([_from_temporal(c) for c in chunks], pa.timestamp("s"))
+    # El lector CSV entrega trozos chicos: se unen para detectar y parsear una vez
+    if isinstance(arr, pa.ChunkedArray):
+        arr = arr.combine_chunks()
+    return pa.chunked_array([_parse_chunk(arr)] if len(arr) else [], pa.timestamp("s"))
+
+# Máscara de enteros válidos (>= 0 y dentro de INTEGER), sea la columna texto o int64
+def int_mask(col):
+    if pa.types.is_integer(col.type):
+        ok = pc.and_(pc.greater_equal(col, 0), pc.less_equal(col, INT32_MAX))
+    else:
+        digits = pc.fill_null(pc.match_substring_regex(col, r"^\d{1,10}$"), False)
+        as_int = pc.cast(pc.if_else(digits, col, "0"), pa.int64())
+        ok = pc.and_(digits, pc.less_equal(as_int, INT32_MAX))
+    return pc.fill_null(ok, False)
+
+def name_mask(col):
+    return pc.fill_null(pc.not_equal(pc.utf8_trim_whitespace(col), ""), False)
+
+# Validación de una tabla Arrow (texto o int64) con motivo por fila
+def validate_table(table: str, tbl: pa.Table, stages=None) -> Tuple[pa.Table, List[Tuple[pa.Table, str]]]:
+    """
+    Retorna (válidos, [(rechazados, motivo)]).
+    Cada fila rechazada aparece una sola vez, con el primer chequeo que falla.
+    Los rechazados conservan los valores originales; los válidos salen
+    tipados (int64 / timestamp[s]) listos para insertar.
+    Columnas extra (p. ej. un índice de fila) se conservan en ambos.
+    Con `stages` (telemetry.Stages) se mide la normalización de datetime.
+    """
+    cols = SCHEMAS[table]
+    checks = [
+        (int_mask(tbl["id"]), "id vacío o no entero"),
+        (name_mask(tbl["name"]), "name vacío"),
+    ]
+    dts = None
+    if "datetime" in cols:
+        # Normalizar datetime de forma flexible (T/Z/microsegundos)
+        if stages is None:
+            dts = parse_datetime_array(tbl["datetime"])
+        else:
+            with stages.time("datetime"):
+                dts = parse_datetime_array(tbl["datetime"])
+        checks.append((pc.is_valid(dts), "datetime vacío o inválido"))
+    for c in INT_COLS[table][1:]:
+        checks.append((int_mask(tbl[c]), f"{c} vacío o no entero"))
+
+    rejects = []
+    remaining = pa.array(np.ones(tbl.num_rows, dtype=bool))
+    for ok, reason in checks:
+        fails = pc.and_(remaining, pc.invert(ok))
+        if pc.any(fails).as_py():
+            rejects.append((tbl.filter(fails), reason))
+            remaining = pc.and_(remaining, ok)
+
+    # Conversión de tipos finales para insertar
+    if dts is not None:
+        tbl = tbl.set_column(tbl.column_names.index("datetime"), "datetime", dts)
+    val = tbl.filter(remaining)
+    for c in INT_COLS[table]:
+        val = val.set_column(val.column_names.index(c), c, pc.cast(val[c], pa.int64()))
+    return val, rejects
+
+# Columnas Arrow a partir de filas JSON (un array por columna, una sola pasada)
+def _json_value(v: Any):
+    if v is None:
+        return None
+    if isinstance(v, float) and v.is_integer():
+        return str(int(v))
+    s = str(v)
+    return None if s.strip() in NULL_TOKENS else s
+
+def table_from_rows(table: str, rows: List[Dict[str, Any]]) -> pa.Table:
+    """
+    Arma una tabla de texto con las columnas del esquema más `_row`
+    (posición 1..n en el request) para reportar rechazos por fila.
+    Campos faltantes quedan en null y se rechazan como vacíos.
+    """
+    data = {c: pa.array([_json_value(r.get(c)) for r in rows], pa.string()) for c in SCHEMAS[table]}
+    data["_row"] = pa.array(range(1, len(rows) + 1), pa.int32())
+    return pa.table(data)
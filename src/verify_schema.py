@@ -1,9 +1,13 @@
 import os
-from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
+import sys
+from sqlalchemy import text
 
-load_dotenv()
-engine = create_engine(os.getenv("DATABASE_URL"), pool_pre_ping=True)
+# Permite ejecutar como script (python src/verify_schema.py) o como módulo
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.db import get_engine
+
+engine = get_engine()
 
 # Probar creación de dimensiones y hecho
 with engine.connect() as conn: